@@ -1,6 +1,11 @@
+# The only copy of the version: setup.py and the cache keys read it.
+__version__ = "1.3.0"
+
 import sys
 from os.path import dirname
 from kerykeion.astrocore import AstroData, Calculator, CalculatorPosition
+from kerykeion.batch import BatchCalculator
+from kerykeion.compact import CompactChart
 from kerykeion.utilities import kr_settings as settings
 from kerykeion.utilities.general import print_settings_path
 from kerykeion.utilities.charts import (
@@ -0,0 +1,219 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Asyncio entry points, for applications running in an event loop:
+        user = await kerykeion.aio.chart("Jack", 1990, 6, 15, 15, 15, "Roma")
+        svg = await kerykeion.aio.render_svg(user)
+    The geonames requests are made with non blocking sockets, the
+    calculations and the rendering run in an executor (the default
+    thread pool of the loop, or the one given to configure()).
+    Semaphores limit the requests and the calculations running at once,
+    the others wait for their turn in the event loop.
+
+    Cancellation: a cancelled call stops waiting at once and closes
+    its connection. A calculation not yet started is never sent to the
+    executor, one already running finishes there and its result is
+    dropped (threads and processes can't be interrupted).
+"""
+
+import asyncio
+from kerykeion.astrocore import CalculatorPosition
+from kerykeion.geoname import (HOST, SEARCH_PATH, TIMEZONE_PATH,
+                               _parse_search, _parse_timezone,
+                               _search_params, _timezone_params)
+from kerykeion.utilities import kr_settings
+from kerykeion.utilities.charts import MakeSvgConfig, MakeSvgInstance
+
+
+async def http_get(host, path, query, timeout=20, port=80):
+    """
+    Makes a HTTP/1.0 GET request with asyncio streams.
+    Returns the body of the response.
+    Raises ConnectionError if the status is not 200,
+    asyncio.TimeoutError after timeout seconds.
+    Args: host, path, url encoded query string, timeout in seconds, port.
+    """
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout)
+    try:
+        request = (f"GET {path}?{query} HTTP/1.0\r\nHost: {host}\r\n"
+                   "User-Agent: kerykeion\r\nConnection: close\r\n\r\n")
+        writer.write(request.encode("ascii"))
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+    if status_line.split(" ")[1:2] != ["200"]:
+        raise ConnectionError(f"Request to {host}{path} failed: {status_line}")
+
+    return body
+
+
+def _compute_chart(name, year, month, day, hours, minuts, lon, lat, tz_str,
+                   city, nation, context):
+    """Internal function, calculates a chart in the executor."""
+    user = CalculatorPosition(name, year, month, day, hours, minuts,
+                              lon, lat, tz_str)
+    user.city = city
+    user.nation = nation
+    if context is not None:
+        user.context = context
+    user.get_all()
+    return user
+
+
+def _render_svg(first, chart_type, second, chart_settings):
+    """Internal function, renders a chart in the executor."""
+    return MakeSvgInstance(chart_settings, first, chart_type,
+                           second).makeSVG()
+
+
+class AsyncClient():
+    """
+    Runs the geocoding and the calculations for an event loop.
+    Args: executor (None for the default executor of the loop, a process
+    pool works too), most calculations running at once, most geonames
+    requests at once, timeout of the requests in seconds,
+    geonames host and port.
+    """
+
+    def __init__(self, executor=None, max_calculations=4, max_requests=8,
+                 timeout=20, host=HOST, port=80):
+        self.executor = executor
+        self.max_calculations = max_calculations
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.host = host
+        self.port = port
+        self._loop = None
+
+    def _limits(self):
+        """
+        Internal function, returns the semaphores of the running loop,
+        created again when the client is used by a new loop.
+        """
+        loop = asyncio.get_event_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._calculations = asyncio.Semaphore(self.max_calculations)
+            self._requests = asyncio.Semaphore(self.max_requests)
+        return loop, self._calculations, self._requests
+
+    async def run(self, func, *args):
+        """
+        Runs a function in the executor, waiting for a free calculation.
+        Returns its result.
+        """
+        loop, calculations, _ = self._limits()
+        async with calculations:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _get(self, path, query):
+        """Internal function, a geonames request waiting for a free slot."""
+        _, _, requests = self._limits()
+        async with requests:
+            return await http_get(self.host, path, query, self.timeout,
+                                  self.port)
+
+    async def search(self, name, country=""):
+        """
+        Searches a city on geonames like kerykeion.geoname.search().
+        Returns a list with the first result, with its time zone,
+        or None if nothing is found.
+        Args: city name, two letters country code (optional).
+        """
+        if not name:
+            raise ValueError("No name specified!")
+
+        data = await self._get(SEARCH_PATH, _search_params(name, country))
+        total, geoname = _parse_search(data)
+        if total == "0" or not geoname:
+            return None
+
+        for place in geoname:
+            data = await self._get(TIMEZONE_PATH, _timezone_params(
+                place["lat"], place["lng"]))
+            place["timezonestr"] = _parse_timezone(data)
+
+        return geoname
+
+    async def chart(self, name, year, month, day, hours, minuts,
+                    city="Greenwich", nation="", lon=None, lat=None,
+                    tz_str=None, context=None):
+        """
+        Calculates a chart, like CalculatorCitySearch when only the city
+        is given or like CalculatorPosition with lon, lat and tz_str.
+        Returns the calculated Calculator.
+        Args: the arguments of CalculatorCitySearch, longitude, latitude,
+        time zone, calculation context (see kerykeion.context).
+        """
+        if lon is None or lat is None or tz_str is None:
+            found = await self.search(city, nation)
+            if not found:
+                raise ValueError(f"City not found: {city}")
+            lon = float(found[0]["lng"])
+            lat = float(found[0]["lat"])
+            tz_str = found[0]["timezonestr"]
+
+        return await self.run(_compute_chart, name, year, month, day, hours,
+                              minuts, lon, lat, tz_str, city, nation, context)
+
+    async def render_svg(self, first, chart_type="Natal", second=None,
+                         chart_settings=None):
+        """
+        Renders the svg of a chart like MakeSvgInstance.makeSVG().
+        Returns the svg string.
+        Args: first Calculator, chart type (Natal, Transit or Composite),
+        second Calculator (for Transit and Composite), MakeSvgConfig
+        (default: the settings of kr_settings).
+        """
+        if chart_settings is None:
+            chart_settings = MakeSvgConfig(kr_settings.english,
+                                           kr_settings.colors,
+                                           kr_settings.planets,
+                                           kr_settings.aspects)
+        return await self.run(_render_svg, first, chart_type, second,
+                              chart_settings)
+
+
+_client = [AsyncClient()]
+
+
+def configure(executor=None, max_calculations=4, max_requests=8, timeout=20):
+    """
+    Replaces the client used by the functions of this module.
+    Args: the arguments of AsyncClient.
+    """
+    _client[0] = AsyncClient(executor, max_calculations, max_requests, timeout)
+    return _client[0]
+
+
+async def search(name, country=""):
+    """See AsyncClient.search()."""
+    return await _client[0].search(name, country)
+
+
+async def chart(*args, **kwargs):
+    """See AsyncClient.chart()."""
+    return await _client[0].chart(*args, **kwargs)
+
+
+async def render_svg(*args, **kwargs):
+    """See AsyncClient.render_svg()."""
+    return await _client[0].render_svg(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    async def main():
+        users = await asyncio.gather(
+            chart("Jack", 1990, 6, 15, 15, 15, lon=12.5, lat=41.9,
+                  tz_str="Europe/Rome"),
+            chart("Jane", 1991, 10, 25, 21, 00, lon=12.5, lat=41.9,
+                  tz_str="Europe/Rome"))
+        svg = await render_svg(users[0], "Composite", users[1])
+        print(users[0].sun["sign"], users[1].sun["sign"], len(svg))
+
+    asyncio.run(main())
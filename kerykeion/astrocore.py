@@ -2,13 +2,168 @@
     This is part of Kerykeion (C) 2020 Giacomo Battaglia
 """
 
+import copy
 import jsonpickle
 import os.path
 import swisseph as swe
+from kerykeion.context import (DEFAULT_AYANAMSA, make_context, set_sid_mode,
+                               swe_calc)
 from kerykeion.geoname import search
-import pytz
+from kerykeion.houses import (HOUSES_NAMES, calc_houses, check_chart_system,
+                              house_index)
+from kerykeion.tzconvert import local_to_utc
+from kerykeion.zodiac import point_dict
 import datetime
-import math
+from collections import namedtuple
+from functools import lru_cache
+
+
+# Bodies calculated for every chart, in the order used by planets_lister().
+PLANETS_IDS = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
+PLANETS_NAMES = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter",
+                 "Saturn", "Uranus", "Neptune", "Pluto", "Mean_Node",
+                 "True_Node"]
+
+
+# Everything swisseph returns for a body, calculated once per chart.
+BodyState = namedtuple("BodyState", ["lon", "lat", "dist", "lon_speed",
+                                     "lat_speed", "dist_speed"])
+
+
+def calc_body_states(j_day, context):
+    """
+    Calculates the state of every body of PLANETS_IDS with a single
+    swe.calc call per body.
+    Args: julian day, calculation context (see kerykeion.context).
+    """
+    return [BodyState(*swe_calc(j_day, planet, context))
+            for planet in PLANETS_IDS]
+
+
+def get_iflag(zodiactype):
+    """
+    Returns the swisseph flags for the zodiac type,
+    setting the sidereal mode of the calling thread when needed.
+    The calculations that can run in other threads use a calculation
+    context and swe_calc() instead (see kerykeion.context).
+    Args: zodiac type ("Tropic" or "sidereal").
+    """
+    context = make_context(zodiactype)
+    if context.ayanamsa:
+        set_sid_mode(context.ayanamsa)
+
+    return context.flags
+
+
+def calc_lunar_phase(sun, moon):
+    """
+    Calculates the lunar phase.
+    Args: longitude of the sun, longitude of the moon.
+    """
+
+    # anti-clockwise degrees between sun and moon
+    degrees_between = moon - sun
+
+    if degrees_between < 0:
+        degrees_between += 360.0
+
+    step = 360.0 / 28.0
+
+    for x in range(28):
+        low = x * step
+        high = (x + 1) * step
+        if degrees_between >= low and degrees_between < high:
+            mphase = x + 1
+
+    sunstep = [0, 30, 40,  50, 60, 70, 80, 90, 120, 130, 140, 150, 160, 170, 180,
+               210, 220, 230, 240, 250, 260, 270, 300, 310, 320, 330, 340, 350]
+
+    for x in range(len(sunstep)):
+
+        low = sunstep[x]
+
+        if x == 27:
+            high = 360
+        else:
+            high = sunstep[x+1]
+        if degrees_between >= low and degrees_between < high:
+            sphase = x + 1
+
+    def moon_emoji(phase):
+        if phase == 1:
+            result = "🌑"
+        elif phase == 14:
+            result = "🌕"
+        elif 7 <= phase <= 9:
+            result = "🌓"
+        elif 20 <= phase <= 22:
+            result = "🌗"
+        elif phase < 7:
+            result = "🌒"
+        elif phase < 14:
+            result = "🌔"
+        elif phase <= 28:
+            result = "🌘"
+        else:
+            result = phase
+
+        return result
+
+    return {
+        "degrees_between_s_m": degrees_between,
+        "moon_phase": mphase,
+        "sun_phase": sphase,
+        "moon_emoji": moon_emoji(mphase)
+    }
+
+
+# Everything of a chart that depends only on the julian day.
+TimeStage = namedtuple("TimeStage", ["planets_state", "planets_degs",
+                                     "planets_retrograde", "lunar_phase"])
+
+
+@lru_cache(maxsize=4096)
+def time_stage(j_day, context):
+    """
+    Calculates the location independent part of a chart: the bodies
+    of planets_lister(), their retrograde flags and the lunar phase.
+    The results are cached, so the charts of the same instant
+    and context calculate it once.
+    Args: julian day, calculation context.
+    """
+    planets_state = tuple(calc_body_states(j_day, context))
+
+    return TimeStage(
+        planets_state,
+        tuple(state.lon for state in planets_state),
+        tuple(state.lon_speed < 0 for state in planets_state),
+        calc_lunar_phase(planets_state[0].lon, planets_state[1].lon)
+    )
+
+
+class lazy_property():
+    """
+    Decorator for the attributes that are calculated on first access
+    and then stored in the instance, like a normal attribute.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = self.func(instance)
+        instance.__dict__[self.name] = value
+        return value
+
+
+def julian_day(utc):
+    """ Calculates julian day from an utc datetime."""
+    time_utc = utc.hour + utc.minute/60
+    return float(swe.julday(utc.year, utc.month, utc.day, time_utc))
 
 
 class AstroData():
@@ -51,28 +206,51 @@ class AstroData():
     def get_tz(self):
         return ""
 
+    @lazy_property
+    def utc(self):
+        """Utc time, calculated on first access."""
+        return self.get_utc()
+
+    @lazy_property
+    def j_day(self):
+        """Julian day, calculated on first access."""
+        return self.get_jd()
+
     def get_utc(self):
         """Converts local time to utc time. """
-        local_time = pytz.timezone(self.get_tz())
-
         naive_datetime = datetime.datetime(self.year, self.month,
                                            self.day, self.hours, self.minuts, 0)
-        local_datetime = local_time.localize(naive_datetime, is_dst=None)
-        utc_datetime = local_datetime.astimezone(pytz.utc)
+        utc_datetime = local_to_utc(self.get_tz(), naive_datetime)
         self.utc = utc_datetime
         return self.utc
 
     def get_jd(self):
         """ Calculates julian day from the utc time."""
-        utc = self.get_utc()
+        utc = self.utc
         self.time_utc = utc.hour + utc.minute/60
         self.time = self.hours + self.minuts/60
-        self.j_day = float(swe.julday(utc.year, utc.month, utc.day,
-                                      self.time_utc))
+        self.j_day = julian_day(utc)
 
         return self.j_day
 
 
+# Lazy attributes of Calculator calculated with a calculation option,
+# calculated again after the option is changed (the values of
+# get_all() are calculated again at once, if they were there).
+CONTEXT_STAGES = {
+    "zodiactype": ("planets_state", "planets_degs", "planets_retrograde",
+                   "lunar_phase"),
+    "ayanamsa": ("planets_state", "planets_degs", "planets_retrograde",
+                 "lunar_phase"),
+    "houses_system": ("houses_degree_ut",),
+}
+
+# Attributes left out of json_dump(): stages kept for the calculations,
+# the house system actually used and the geocoding functions.
+JSON_HIDDEN = ("planets_state", "planets_retrograde", "houses_system_used",
+               "geocoder", "tz_resolver")
+
+
 class Calculator(AstroData):
     """
     Calculates all the astrological informations.
@@ -99,12 +277,58 @@ class Calculator(AstroData):
         tz_str=False
     ):
         super().__init__(name, year, month, day, hours, minuts, city, lon, lat, tz_str)
-        self.j_day = self.get_jd()
         self.zodiactype = "Tropic"
+        self.ayanamsa = DEFAULT_AYANAMSA
+        self.houses_system = "P"
 
     def __str__(self):
         return f"Astrological data for: {self.name}, {self.utc} UTC"
 
+    def __setattr__(self, name, value):
+        if name in CONTEXT_STAGES:
+            self._set_options({name: value})
+        else:
+            super().__setattr__(name, value)
+
+    def _set_options(self, options):
+        """
+        Internal function, sets zodiactype, ayanamsa and houses_system.
+        The stages calculated with the old values are dropped and,
+        if the chart was calculated, get_all() runs again.
+        Raises ValueError for values make_context() doesn't accept.
+        """
+        values = {name: self.__dict__.get(name) for name in CONTEXT_STAGES}
+        values.update(options)
+        if None not in values.values():
+            make_context(**values)
+
+        changed = [name for name, value in options.items()
+                   if name in self.__dict__ and self.__dict__[name] != value]
+        self.__dict__.update(options)
+        for name in changed:
+            for stage in CONTEXT_STAGES[name]:
+                self.__dict__.pop(stage, None)
+
+        if changed and ("planets_list" in self.__dict__
+                        or "house_list" in self.__dict__):
+            self.get_all()
+
+    @property
+    def context(self):
+        """
+        Calculation context of the chart, from zodiactype,
+        ayanamsa and houses_system. Setting it sets them.
+        """
+        return make_context(self.zodiactype, self.ayanamsa,
+                            self.houses_system)
+
+    @context.setter
+    def context(self, context):
+        # the three at once, calculated again only once.
+        self._set_options({"zodiactype": context.zodiactype,
+                           "ayanamsa": context.ayanamsa or DEFAULT_AYANAMSA,
+                           "houses_system": context.houses_system})
+
     def get_number(self, name):
         """Internal function, gets number id from the name."""
         name = name.lower()
@@ -139,77 +363,25 @@ class Calculator(AstroData):
     def pos_calc(self, degree, number_name, label):
         """A function to be used in others to create a dictionary deviding 
         the houses or the planets list."""
-        if degree < 30:
-            hou_dic = {label: number_name, "quality": "Cardinal", "element":
-                       "Fire", "sign": "Ari", "sign_num": 0, "pos": degree, "abs_pos": degree,
-                       "emoji": "♈️"}
-        elif degree < 60:
-            result = degree - 30
-            hou_dic = {label: number_name, "quality": "Fixed", "element":
-                       "Earth", "sign": "Tau", "sign_num": 1, "pos": result, "abs_pos": degree,
-                       "emoji": "♉️"}
-        elif degree < 90:
-            result = degree - 60
-            hou_dic = {label: number_name, "quality": "Mutable", "element":
-                       "Air", "sign": "Gem", "sign_num": 2, "pos": result, "abs_pos": degree,
-                       "emoji": "♊️"}
-        elif degree < 120:
-            result = degree - 90
-            hou_dic = {label: number_name, "quality": "Cardinal", "element":
-                       "Water", "sign": "Can", "sign_num": 3, "pos": result, "abs_pos": degree,
-                       "emoji": "♋️"}
-        elif degree < 150:
-            result = degree - 120
-            hou_dic = {label: number_name, "quality": "Fixed", "element":
-                       "Fire", "sign": "Leo", "sign_num": 4, "pos": result, "abs_pos": degree,
-                       "emoji": "♌️"}
-        elif degree < 180:
-            result = degree - 150
-            hou_dic = {label: number_name, "quality": "Mutable", "element":
-                       "Earth", "sign": "Vir", "sign_num": 5, "pos": result, "abs_pos": degree,
-                       "emoji": "♍️"}
-        elif degree < 210:
-            result = degree - 180
-            hou_dic = {label: number_name, "quality": "Cardinal", "element":
-                       "Air", "sign": "Lib", "sign_num": 6, "pos": result, "abs_pos": degree,
-                       "emoji": "♎️"}
-        elif degree < 240:
-            result = degree - 210
-            hou_dic = {label: number_name, "quality": "Fixed", "element":
-                       "Water", "sign": "Sco", "sign_num": 7, "pos": result, "abs_pos": degree,
-                       "emoji": "♏️"}
-        elif degree < 270:
-            result = degree - 240
-            hou_dic = {label: number_name, "quality": "Mutable", "element":
-                       "Fire", "sign": "Sag", "sign_num": 8, "pos": result, "abs_pos": degree,
-                       "emoji": "♐️"}
-        elif degree < 300:
-            result = degree - 270
-            hou_dic = {label: number_name, "quality": "Cardinal", "element":
-                       "Earth", "sign": "Cap", "sign_num": 9, "pos": result, "abs_pos": degree,
-                       "emoji": "♑️"}
-        elif degree < 330:
-            result = degree - 300
-            hou_dic = {label: number_name, "quality": "Fixed", "element":
-                       "Air", "sign": "Aqu", "sign_num": 10, "pos": result, "abs_pos": degree,
-                       "emoji": "♒️"}
-        elif degree < 360:
-            result = degree - 330
-            hou_dic = {label: number_name, "quality": "Mutable", "element":
-                       "Water", "sign": "Pis", "sign_num": 11, "pos": result, "abs_pos": degree,
-                       "emoji": "♓️"}
-        else:
-            hou_dic = {label: "pos_calc error", "sign": "pos_calc error",
-                       "pos": "pos_calc error"}
+        return point_dict(degree, number_name, label)
 
-        return hou_dic
+    @lazy_property
+    def houses_degree_ut(self):
+        """
+        House cusps in 360°, calculated on first access.
+        Inside the polar circles Placidus falls back to Porphyry,
+        the system used is stored in houses_system_used.
+        """
+        # the julian day comes first, it can set the coordinates.
+        j_day = self.j_day
+        cusps, _, self.houses_system_used = calc_houses(
+            j_day, self.city_lat, self.city_long,
+            check_chart_system(self.houses_system))
+        return cusps
 
     def houses(self):
         """Calculatetype positions and store them in dictionaries"""
 
-        # creates the list of the house in 360°
-        self.houses_degree_ut = swe.houses(self.j_day, self.city_lat,
-                                           self.city_long)[0]
         # stores the house in signulare dictionaries.
         self.first_house = self.pos_calc(self.houses_degree_ut[0], "1", "name")
         self.second_house = self.pos_calc(
@@ -244,43 +416,49 @@ class Calculator(AstroData):
 
         return self.house_list
 
+    @lazy_property
+    def planets_state(self):
+        """State of the bodies, calculated on first access."""
+        self.planets_lister()
+        return self.planets_state
+
+    @lazy_property
+    def planets_degs(self):
+        """Longitude of the bodies, calculated on first access."""
+        self.planets_lister()
+        return self.planets_degs
+
+    @lazy_property
+    def planets_retrograde(self):
+        """Retrograde flag of the bodies, calculated on first access."""
+        return list(time_stage(self.j_day, self.context).planets_retrograde)
+
+    @lazy_property
+    def lunar_phase(self):
+        """Lunar phase, calculated on first access."""
+        self.lunar_phase_calc()
+        return self.lunar_phase
+
     def planets_lister(self):
         """Sidereal or tropic mode."""
-        self.iflag = swe.FLG_SWIEPH+swe.FLG_SPEED
-
-        if self.zodiactype == "sidereal":
-            self.iflag += swe.FLG_SIDEREAL
-            mode = "SIDM_FAGAN_BRADLEY"
-            swe.set_sid_mode(getattr(swe, mode))
+        self.iflag = self.context.flags
 
         """Calculates the position of the planets and stores it in a list."""
 
-        self.sun_deg = swe.calc(self.j_day, 0, self.iflag)[0][0]
-        self.moon_deg = swe.calc(self.j_day, 1, self.iflag)[0][0]
-        self.mercury_deg = swe.calc(self.j_day, 2, self.iflag)[0][0]
-        self.venus_deg = swe.calc(self.j_day, 3, self.iflag)[0][0]
-        self.mars_deg = swe.calc(self.j_day, 4, self.iflag)[0][0]
-        self.jupiter_deg = swe.calc(self.j_day, 5, self.iflag)[0][0]
-        self.saturn_deg = swe.calc(self.j_day, 6, self.iflag)[0][0]
-        self.uranus_deg = swe.calc(self.j_day, 7, self.iflag)[0][0]
-        self.neptune_deg = swe.calc(self.j_day, 8, self.iflag)[0][0]
-        self.pluto_deg = swe.calc(self.j_day, 9, self.iflag)[0][0]
-        self.mean_node_deg = swe.calc(self.j_day, 10, self.iflag)[0][0]
-        self.true_node_deg = swe.calc(self.j_day, 11, self.iflag)[0][0]
-
-        #print(swe.calc(self.j_day, 7, self.iflag)[3])
-
-        self.planets_degs = [self.sun_deg, self.moon_deg, self.mercury_deg,
-                             self.venus_deg, self.mars_deg, self.jupiter_deg, self.saturn_deg,
-                             self.uranus_deg, self.neptune_deg, self.pluto_deg, self.mean_node_deg,
-                             self.true_node_deg]
+        stage = time_stage(self.j_day, self.context)
+        self.planets_state = list(stage.planets_state)
+        self.planets_degs = list(stage.planets_degs)
+
+        (self.sun_deg, self.moon_deg, self.mercury_deg, self.venus_deg,
+         self.mars_deg, self.jupiter_deg, self.saturn_deg, self.uranus_deg,
+         self.neptune_deg, self.pluto_deg, self.mean_node_deg,
+         self.true_node_deg) = self.planets_degs
 
         return self.planets_degs
 
     def planets(self):
         """ Defines body positon in signs and informations and
          stores them in dictionaries"""
-        self.planets_degs = self.planets_lister()
         # stores the planets in signulare dictionaries.
         self.sun = self.pos_calc(self.planets_degs[0], "Sun", "name")
         self.moon = self.pos_calc(self.planets_degs[1], "Moon", "name")
@@ -309,77 +487,12 @@ class Calculator(AstroData):
         self.planets()
         self.houses()
 
-        def for_every_planet(planet, deg_planet):
-            """Functio to do the calculation.
-            Args: planet dictionary, planet degree"""
-
-            def point_between(p1, p2, p3):
-                """Finds if a point is between two other in a circle
-                args: first point, second point, point in the middle"""
-                p1_p2 = math.fmod(p2 - p1 + 360, 360)
-                p1_p3 = math.fmod(p3 - p1 + 360, 360)
-                if (p1_p2 <= 180) != (p1_p3 > p1_p2):
-                    return True
-                else:
-                    return False
-
-            if point_between(self.houses_degree_ut[0], self.houses_degree_ut[1],
-                             deg_planet) == True:
-                planet["house"] = "1st House"
-            elif point_between(self.houses_degree_ut[1], self.houses_degree_ut[2],
-                               deg_planet) == True:
-                planet["house"] = "2nd House"
-            elif point_between(self.houses_degree_ut[2], self.houses_degree_ut[3],
-                               deg_planet) == True:
-                planet["house"] = "3rd House"
-            elif point_between(self.houses_degree_ut[3], self.houses_degree_ut[4],
-                               deg_planet) == True:
-                planet["house"] = "4th House"
-            elif point_between(self.houses_degree_ut[4], self.houses_degree_ut[5],
-                               deg_planet) == True:
-                planet["house"] = "5th House"
-            elif point_between(self.houses_degree_ut[5], self.houses_degree_ut[6],
-                               deg_planet) == True:
-                planet["house"] = "6th House"
-            elif point_between(self.houses_degree_ut[6], self.houses_degree_ut[7],
-                               deg_planet) == True:
-                planet["house"] = "7th House"
-            elif point_between(self.houses_degree_ut[7], self.houses_degree_ut[8],
-                               deg_planet) == True:
-                planet["house"] = "8th House"
-            elif point_between(self.houses_degree_ut[8], self.houses_degree_ut[9],
-                               deg_planet) == True:
-                planet["house"] = "9th House"
-            elif point_between(self.houses_degree_ut[9], self.houses_degree_ut[10],
-                               deg_planet) == True:
-                planet["house"] = "10th House"
-            elif point_between(self.houses_degree_ut[10], self.houses_degree_ut[11],
-                               deg_planet) == True:
-                planet["house"] = "11th House"
-            elif point_between(self.houses_degree_ut[11], self.houses_degree_ut[0],
-                               deg_planet) == True:
-                planet["house"] = "12th House"
-            else:
-                planet["house"] = "error!"
-
-            return planet
-
-        self.sun = for_every_planet(self.sun, self.sun_deg)
-        self.moon = for_every_planet(self.moon, self.moon_deg)
-        self.mercury = for_every_planet(self.mercury, self.mercury_deg)
-        self.venus = for_every_planet(self.venus, self.venus_deg)
-        self.mars = for_every_planet(self.mars, self.mars_deg)
-        self.jupiter = for_every_planet(self.jupiter, self.jupiter_deg)
-        self.saturn = for_every_planet(self.saturn, self.saturn_deg)
-        self.uranus = for_every_planet(self.uranus, self.uranus_deg)
-        self.neptune = for_every_planet(self.neptune, self.neptune_deg)
-        self.pluto = for_every_planet(self.pluto, self.pluto_deg)
-        self.mean_node = for_every_planet(self.mean_node, self.mean_node_deg)
-        self.true_node = for_every_planet(self.true_node, self.true_node_deg)
+        # house numbers from 1 to 12, the names are only for the dictionaries.
+        self.planets_houses = [house_index(self.houses_degree_ut, deg)
+                               for deg in self.planets_degs]
 
-        self.planets_list = [self.sun, self.moon, self.mercury, self.venus,
-                             self.mars, self.jupiter, self.saturn, self.uranus, self.neptune,
-                             self.pluto, self.mean_node, self.true_node]
+        for planet, house in zip(self.planets_list, self.planets_houses):
+            planet["house"] = HOUSES_NAMES[house - 1]
 
         return self.planets_list
 
@@ -390,7 +503,7 @@ class Calculator(AstroData):
         planets_ret = []
         for plan in self.planets_list:
             planet_number = self.get_number(plan["name"])
-            if swe.calc(self.j_day, planet_number, self.iflag)[0][3] < 0:
+            if self.planets_retrograde[planet_number]:
                 plan.update({'retrograde': True})
             else:
                 plan.update({'retrograde': False})
@@ -401,61 +514,7 @@ class Calculator(AstroData):
     def lunar_phase_calc(self):
         """ Function to calculate the lunar phase"""
 
-        # anti-clockwise degrees between sun and moon
-        moon, sun = self.planets_degs[1], self.planets_degs[0]
-        degrees_between = moon - sun
-
-        if degrees_between < 0:
-            degrees_between += 360.0
-
-        step = 360.0 / 28.0
-
-        for x in range(28):
-            low = x * step
-            high = (x + 1) * step
-            if degrees_between >= low and degrees_between < high:
-                mphase = x + 1
-
-        sunstep = [0, 30, 40,  50, 60, 70, 80, 90, 120, 130, 140, 150, 160, 170, 180,
-                   210, 220, 230, 240, 250, 260, 270, 300, 310, 320, 330, 340, 350]
-
-        for x in range(len(sunstep)):
-
-            low = sunstep[x]
-
-            if x == 27:
-                high = 360
-            else:
-                high = sunstep[x+1]
-            if degrees_between >= low and degrees_between < high:
-                sphase = x + 1
-
-        def moon_emoji(phase):
-            if phase == 1:
-                result = "🌑"
-            elif phase == 14:
-                result = "🌕"
-            elif 7 <= phase <= 9:
-                result = "🌓"
-            elif 20 <= phase <= 22:
-                result = "🌗"
-            elif phase < 7:
-                result = "🌒"
-            elif phase < 14:
-                result = "🌔"
-            elif phase <= 28:
-                result = "🌘"
-            else:
-                result = phase
-
-            return result
-
-        self.lunar_phase = {
-            "degrees_between_s_m": degrees_between,
-            "moon_phase": mphase,
-            "sun_phase": sphase,
-            "moon_emoji": moon_emoji(mphase)
-        }
+        self.lunar_phase = dict(time_stage(self.j_day, self.context).lunar_phase)
 
     def get_all(self):
         """ Gets all data from all the functions """
@@ -476,7 +535,11 @@ class Calculator(AstroData):
 
         self.json_path = os.path.join(
             self.json_dir, f"{self.name}_kerykeion.json")
-        json_string = jsonpickle.encode(self)
+        # a copy without the hidden attributes, the chart doesn't change.
+        shown = copy.copy(self)
+        for name in JSON_HIDDEN:
+            shown.__dict__.pop(name, None)
+        json_string = jsonpickle.encode(shown)
 
         hiden_values = [
             f' "json_dir": "{self.json_dir}",', f', "json_path": "{self.json_path}"']
@@ -494,6 +557,12 @@ class Calculator(AstroData):
 
 
 class CalculatorPosition(Calculator):
+    """
+    Calculator of a longitude and latitude. Without the time zone,
+    it's found by tz_resolver, a function of latitude and longitude
+    (ex: TimezoneIndex("timezones.npz").timezone_at, see kerykeion.tzindex).
+    """
+
     def __init__(self,
                  name,
                  year,
@@ -503,14 +572,28 @@ class CalculatorPosition(Calculator):
                  minuts,
                  lon,
                  lat,
-                 tz_str):
+                 tz_str=False,
+                 tz_resolver=None):
         super().__init__(name, year, month, day, hours, minuts, "", lon, lat, tz_str)
+        self.tz_resolver = tz_resolver
 
     def get_tz(self):
+        if not self.city_tz:
+            if self.tz_resolver is None:
+                raise ValueError("No time zone and no tz_resolver given.")
+            self.city_tz = self.tz_resolver(float(self.city_lat),
+                                            float(self.city_long))
         return self.city_tz
 
 
 class CalculatorCitySearch(Calculator):
+    """
+    Calculator finding longitude, latitude and time zone of the city.
+    The geocoder is a function like kerykeion.geoname.search() (the
+    default), ex: GeoIndex("cities.idx").search to search offline
+    (see kerykeion.geoindex).
+    """
+
     def __init__(self,
                  name,
                  year,
@@ -518,26 +601,22 @@ class CalculatorCitySearch(Calculator):
                  day,
                  hours,
                  minuts,
-                 city="Greenwich"):
+                 city="Greenwich",
+                 nation="",
+                 geocoder=None):
         super().__init__(name, year, month, day, hours, minuts, city)
+        self.nation = nation
+        self.geocoder = search if geocoder is None else geocoder
 
     def get_tz(self):
         """Gets the nerest time zone for the calculation"""
 
-        self.city_data = search(self.city, self.nation)[0]
+        self.city_data = self.geocoder(self.city, self.nation)[0]
 
         self.city_long = float(self.city_data["lng"])
         self.city_lat = float(self.city_data["lat"])
         self.city_tz = self.city_data["timezonestr"]
 
-        if self.city_lat > 66.0:
-            self.city_lat = 66.0
-            print("polar circle override for houses, using 66 degrees")
-
-        elif self.city_lat < -66.0:
-            self.city_lat = -66.0
-            print("polar circle override for houses, using -66 degrees")
-
         return self.city_tz
 
 
@@ -0,0 +1,181 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    City suggestions while typing, from an offline index of
+    kerykeion.geoindex:
+        places = Autocomplete("cities.idx").suggest("sao pa")
+        user = CalculatorPosition("Jack", 1990, 6, 15, 15, 15,
+                                  places[0].lng, places[0].lat,
+                                  places[0].tz_str)
+    The names of the index are sorted, so the names starting with what
+    was typed are a range of it, found with a binary search on their
+    first bytes (as integers); the cities are ranked by population.
+    The input is normalized like the names (case and accents don't
+    matter, "sao" finds "São Paulo"). With fuzzy=True, when the
+    prefix finds less than n cities, the prefixes at edit distance 1
+    (a letter missing, added, changed or two letters swapped) fill the
+    suggestions: the ranges of all of them come from one searchsorted.
+"""
+
+from collections import namedtuple
+import numpy as np
+from kerykeion.cache import LRUCache
+from kerykeion.geoindex import KEY_HEAD, GeoIndex, normalize
+
+
+# Letters tried for the typos of fuzzy matching.
+ALPHABET = "abcdefghijklmnopqrstuvwxyz -'"
+
+# Shortest input matched with typos, shorter prefixes match too much.
+FUZZY_MIN_LENGTH = 3
+
+# Inputs up to this length match large ranges, their suggestions
+# are cached.
+CACHED_LENGTH = 2
+
+Place = namedtuple("Place", ["name", "country_code", "country_name", "lat",
+                             "lng", "tz_str", "population", "geonameid"])
+
+
+def typo_prefixes(prefix):
+    """
+    Returns the prefixes at edit distance 1 from prefix:
+    deletions, transpositions, substitutions and insertions.
+    """
+    splits = [(prefix[:i], prefix[i:]) for i in range(len(prefix) + 1)]
+    variants = set([a + b[1:] for a, b in splits if b]
+                   + [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
+                   + [a + c + b[1:] for a, b in splits if b for c in ALPHABET]
+                   + [a + c + b for a, b in splits for c in ALPHABET])
+    variants.discard(prefix)
+    return [v for v in variants if v.strip()]
+
+
+class Autocomplete():
+    """
+    Suggests cities from an offline index.
+    Args: GeoIndex or path of the index file.
+    """
+
+    def __init__(self, index):
+        self.index = index if isinstance(index, GeoIndex) else GeoIndex(index)
+        self._cache = LRUCache(4096)
+
+    def _ranges(self, prefixes):
+        """
+        Internal function, the ranges of the keys starting with the first
+        bytes of the prefixes, only the ranges that aren't empty:
+        (start, end, prefix) tuples.
+        """
+        padded = b"".join([p[:KEY_HEAD].ljust(KEY_HEAD, b"\0")
+                           for p in prefixes])
+        lows = np.frombuffer(padded, dtype=">u8").astype(np.uint64)
+        lengths = np.fromiter(map(len, prefixes), dtype=np.int64,
+                              count=len(prefixes))
+        shifts = (8 * (KEY_HEAD - np.minimum(lengths, KEY_HEAD))).astype(
+            np.uint64)
+        highs = lows | ((np.uint64(1) << shifts) - np.uint64(1))
+
+        # searchsorted is faster with sorted values; the second one is
+        # needed only for the ranges that aren't empty.
+        key_head = self.index.key_head
+        order = np.argsort(lows)
+        starts = np.searchsorted(key_head, lows[order], "left")
+        found = starts < len(key_head)
+        found[found] = key_head[starts[found]] <= highs[order][found]
+        order = order[found]
+        ends = np.searchsorted(key_head, highs[order], "right")
+        return [(start, end, prefixes[i]) for start, end, i in
+                zip(starts[found].tolist(), ends.tolist(), order.tolist())]
+
+    def _best(self, prefixes, n, country, exclude=()):
+        """
+        Internal function, the n most populated cities with a name
+        starting with one of the prefixes (utf-8 bytes).
+        """
+        index = self.index
+        ranges = self._ranges(prefixes)
+        if not ranges:
+            return []
+
+        # the most populated keys of every range, more of them while
+        # duplicates and other countries leave less than n cities.
+        wanted = 4 * n
+        while True:
+            keys = []
+            for start, end, prefix in ranges:
+                if end - start > wanted:
+                    top = np.argpartition(-index.key_population[start:end],
+                                          wanted)[:wanted] + start
+                else:
+                    top = np.arange(start, end)
+                if len(prefix) > KEY_HEAD:
+                    top = [k for k in top.tolist()
+                           if index._key(k).startswith(prefix)]
+                keys.extend(top)
+
+            keys = np.array(keys, dtype=np.int64)
+            records = index.key_record[keys]
+            order = np.argsort(-index.key_population[keys], kind="stable")
+            found = []
+            for record in records[order].tolist():
+                if record in found or record in exclude:
+                    continue
+                if country and index.country[record] != country:
+                    continue
+                found.append(record)
+                if len(found) == n:
+                    return found
+
+            if all(end - start <= wanted for start, end, _ in ranges):
+                return found
+            wanted *= 4
+
+    def place(self, record):
+        """Returns a Place from the index of a city."""
+        city = self.index.city(record)
+        return Place(city["name"], city["countryCode"], city["countryName"],
+                     float(city["lat"]), float(city["lng"]),
+                     city["timezonestr"], int(self.index.population[record]),
+                     int(city["geonameId"]))
+
+    def suggest(self, text, n=10, country="", fuzzy=True):
+        """
+        Returns up to n Places with a name starting with text, the most
+        populated first, then (with fuzzy) the ones matching with a typo.
+        Args: typed text, number of suggestions, two letters country
+        code (optional), True to match typos.
+        """
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        key = (prefix, n, country, fuzzy)
+        if len(prefix) <= CACHED_LENGTH:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        country = country.upper().encode("ascii")
+        found = self._best([prefix.encode("utf-8")], n, country)
+        if fuzzy and len(found) < n and len(prefix) >= FUZZY_MIN_LENGTH:
+            typos = [t.encode("utf-8") for t in typo_prefixes(prefix)]
+            found += self._best(typos, n - len(found), country, set(found))
+
+        places = [self.place(record) for record in found]
+        if len(prefix) <= CACHED_LENGTH:
+            self._cache.put(key, places)
+        return places
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python -m kerykeion.autocomplete cities.idx "sao pa"
+    autocomplete = Autocomplete(sys.argv[1])
+    start = time.perf_counter()
+    places = autocomplete.suggest(sys.argv[2])
+    print(f"{(time.perf_counter() - start) * 1000:.3f} ms")
+    for place in places:
+        print(place)
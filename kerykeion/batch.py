@@ -0,0 +1,154 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import datetime
+import numpy as np
+import pytz
+import swisseph as swe
+from kerykeion.astrocore import PLANETS_IDS, BodyState, julian_day
+from kerykeion.context import SWE_LOCK, as_context, set_sid_mode, swe_calc
+from kerykeion.houses import assign_houses, check_chart_system, houses_grid
+
+
+def to_julian_days(times):
+    """
+    Converts a list of utc datetimes or julian days to an array
+    of julian days, using the same conversion as Calculator.
+    Naive datetimes are considered utc.
+    """
+    times = list(times) if not isinstance(times, np.ndarray) else times
+    if len(times) and isinstance(times[0], datetime.datetime):
+        j_days = []
+        for t in times:
+            if t.tzinfo is not None:
+                t = t.astimezone(pytz.utc)
+            j_days.append(julian_day(t))
+        return np.array(j_days, dtype=np.float64)
+
+    return np.asarray(times, dtype=np.float64)
+
+
+def body_series(body, j_days, zodiactype="Tropic"):
+    """
+    Calculates longitude and speed of one body for many julian days.
+    Returns two arrays shaped like the julian days.
+    Args: swisseph body id (see PLANETS_IDS), julian days,
+    zodiac type or calculation context.
+    """
+    context = as_context(zodiactype)
+    j_days = np.asarray(j_days, dtype=np.float64)
+    lon = np.empty(j_days.shape)
+    speed = np.empty(j_days.shape)
+
+    for index in np.ndindex(j_days.shape):
+        pos = swe_calc(j_days[index], body, context)
+        lon[index] = pos[0]
+        speed[index] = pos[3]
+
+    return lon, speed
+
+
+class BatchCalculator():
+    """
+    Calculates the planets and the houses of many charts at once,
+    the results are stored in NumPy arrays with one row for every chart.
+    Args: utc datetimes or julian days, latitudes and longitudes
+    (a single value is used for all the charts, they can be left
+    empty if the houses are not needed), zodiac type (or calculation
+    context), house system (one of kerykeion.houses.CHART_SYSTEMS).
+    """
+
+    def __init__(self, times, lat=None, lon=None, zodiactype="Tropic",
+                 houses_system="P"):
+        self.j_days = to_julian_days(times)
+        self.zodiactype = zodiactype
+        self.houses_system = check_chart_system(houses_system)
+        self.lat = self._broadcast(lat)
+        self.lon = self._broadcast(lon)
+
+    def __len__(self):
+        return len(self.j_days)
+
+    def _broadcast(self, values):
+        """Internal function, repeats a single value for every chart."""
+        if values is None:
+            return None
+        return np.broadcast_to(np.asarray(values, dtype=np.float64),
+                               self.j_days.shape)
+
+    def planets(self):
+        """
+        Calculates the state of the bodies of planets_lister() for every
+        chart, stored in an array shaped (charts, bodies, BodyState fields).
+        Longitudes and speeds are views shaped (charts, bodies).
+        Charts at the same instant are calculated once.
+        """
+        context = as_context(self.zodiactype)
+        self.iflag = context.flags
+
+        # straight into the array: the time_stage() cache of the single
+        # charts would only be filled with instants used once.
+        unique_days, inverse = np.unique(self.j_days, return_inverse=True)
+        states = np.empty(
+            (len(unique_days), len(PLANETS_IDS), len(BodyState._fields)))
+
+        for row, j_day in enumerate(unique_days.tolist()):
+            # like swe_calc(), with one lock for all the bodies.
+            with SWE_LOCK:
+                if context.ayanamsa:
+                    set_sid_mode(context.ayanamsa)
+                for column, body in enumerate(PLANETS_IDS):
+                    states[row, column] = swe.calc(j_day, body,
+                                                   context.flags)[0]
+
+        self.planets_state = states[inverse.ravel()]
+        self.planets_degs = self.planets_state[:, :, 0]
+        self.planets_speed = self.planets_state[:, :, 3]
+
+        return self.planets_degs, self.planets_speed
+
+    def houses(self):
+        """
+        Calculates the house cusps for every chart, stores them
+        in an array shaped (charts, 12), the angles in an array
+        shaped (charts, 4) and where the polar fallback was used
+        (see kerykeion.houses).
+        """
+        if self.lat is None or self.lon is None:
+            raise ValueError("Latitude and longitude are needed for houses.")
+
+        self.houses_degree_ut, self.angles, self.houses_fallback = houses_grid(
+            self.j_days, self.lat, self.lon, self.houses_system)
+
+        return self.houses_degree_ut
+
+    def planets_house(self):
+        """
+        Finds the house (1 to 12) of every body in every chart,
+        stores them in an array shaped (charts, bodies).
+        """
+        self.planets_houses = assign_houses(self.houses_degree_ut,
+                                            self.planets_degs)
+        return self.planets_houses
+
+    def get_all(self):
+        """ Gets all data from all the functions """
+
+        self.planets()
+        if self.lat is not None and self.lon is not None:
+            self.houses()
+            self.planets_house()
+
+
+if __name__ == "__main__":
+    from kerykeion.astrocore import CalculatorPosition
+
+    kanye = CalculatorPosition("Kanye", 1977, 6, 8, 8, 45, -84.38, 33.749,
+                               "America/New_York")
+    kanye.get_all()
+
+    batch = BatchCalculator([kanye.utc] * 3, 33.749, -84.38)
+    batch.get_all()
+    print(batch.planets_degs[0] - np.array(kanye.planets_degs))
+    print(batch.houses_degree_ut[0] - np.array(kanye.houses_degree_ut))
@@ -0,0 +1,197 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import datetime
+import multiprocessing
+from collections import deque, namedtuple
+from itertools import islice
+import numpy as np
+from kerykeion.astrocore import CalculatorPosition, CalculatorCitySearch
+from kerykeion.compact import CompactChart
+from kerykeion.tzconvert import local_to_julian_days
+
+
+# Result of a single record: the chart or the error that stopped it.
+BulkResult = namedtuple("BulkResult", ["index", "chart", "error"])
+
+
+def make_calculator(record):
+    """
+    Creates the Calculator of a birth record.
+    Args: a dictionary with the arguments of CalculatorPosition
+    (or CalculatorCitySearch when lon, lat and tz_str are missing),
+    or a tuple with the positional arguments of CalculatorPosition.
+    """
+    if not isinstance(record, dict):
+        return CalculatorPosition(*record)
+    if "tz_str" in record:
+        return CalculatorPosition(**record)
+    return CalculatorCitySearch(**record)
+
+
+def compute_chart(record):
+    """Calculates the compact chart of a birth record."""
+    user = make_calculator(record)
+    user.get_all()
+    return CompactChart.from_calculator(user)
+
+
+def _compute_chunk(chunk):
+    """
+    Internal function, calculates a chunk of (index, record) in a worker,
+    an error is reported in the result and doesn't stop the chunk.
+    """
+    results = []
+    for index, record in chunk:
+        try:
+            results.append(BulkResult(index, compute_chart(record), None))
+        except Exception as error:
+            results.append(BulkResult(
+                index, None, f"{type(error).__name__}: {error}"))
+    return results
+
+
+def _record_instant(record):
+    """
+    Internal function, returns time zone and local time of a record,
+    None when they are not known before calculating it.
+    """
+    if isinstance(record, dict):
+        if "tz_str" not in record:
+            return None
+        tz_str = record["tz_str"]
+        values = [record.get(key) for key in
+                  ("year", "month", "day", "hours", "minuts")]
+    else:
+        if len(record) < 9:
+            return None
+        tz_str = record[8]
+        values = record[1:6]
+
+    try:
+        return tz_str, datetime.datetime(*values)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sort_by_instant(batch):
+    """
+    Internal function, sorts a list of (index, record) by julian day,
+    so the charts of the same instant go to the same worker
+    and its time_stage() cache calculates them once.
+    """
+    keys = np.full(len(batch), np.inf)
+    zones = {}
+    for position, (_, record) in enumerate(batch):
+        instant = _record_instant(record)
+        if instant is not None:
+            zones.setdefault(instant[0], []).append((position, instant[1]))
+
+    for tz_str, items in zones.items():
+        positions = [item[0] for item in items]
+        try:
+            j_days, _ = local_to_julian_days(tz_str, [item[1] for item in items])
+        except Exception:
+            # a wrong time zone fails later, in its own record.
+            continue
+        keys[positions] = np.where(np.isnan(j_days), np.inf, j_days)
+
+    return [batch[i] for i in np.argsort(keys, kind="stable")]
+
+
+def _chunks(records, chunksize, window):
+    """
+    Internal function, reads window chunks of records at once and
+    splits them, grouped by julian day, in lists of (index, record).
+    """
+    records = enumerate(records)
+    while True:
+        batch = list(islice(records, chunksize * window))
+        if not batch:
+            return
+        batch = _sort_by_instant(batch)
+        for start in range(0, len(batch), chunksize):
+            yield batch[start:start + chunksize]
+
+
+def _in_order(chunks_results):
+    """
+    Internal function, yields the results of the chunks
+    by index as soon as the previous ones are there.
+    """
+    waiting = {}
+    next_index = 0
+    for results in chunks_results:
+        for result in results:
+            waiting[result.index] = result
+        while next_index in waiting:
+            yield waiting.pop(next_index)
+            next_index += 1
+
+
+def _submit(pool, chunks, max_pending, func=_compute_chunk):
+    """
+    Internal function, sends the chunks to the pool keeping at most
+    max_pending of them waiting, yields their results in order.
+    """
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(func, (chunk,)))
+        if len(pending) >= max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def iter_charts(records, workers=None, chunksize=100, max_pending=None):
+    """
+    Calculates the charts of many birth records with a pool of processes,
+    yielding a BulkResult for every record in the input order.
+    The records are read only when a worker is free to take them,
+    so the memory used doesn't depend on the number of records.
+    The records read together are grouped by julian day, so every
+    distinct instant is calculated once.
+    Args: iterable of records (see make_calculator), number of processes
+    (default: number of cpus, 1 calculates in this process),
+    records sent to a worker at once, chunks sent to the pool and
+    not yet yielded (default: two for every process).
+    """
+    workers = workers or multiprocessing.cpu_count()
+    max_pending = max_pending or 2 * workers
+    chunks = _chunks(records, chunksize, max_pending)
+
+    if workers == 1:
+        yield from _in_order(map(_compute_chunk, chunks))
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from _in_order(_submit(pool, chunks, max_pending))
+
+
+def compute_charts(records, workers=None, chunksize=100):
+    """
+    Calculates the charts of many birth records with a pool of processes.
+    Returns a list of BulkResult in the input order, the failed
+    records have the chart set to None and the error message.
+    Args: iterable of records (see make_calculator), number of processes
+    (default: number of cpus), records sent to a worker at once.
+    """
+    return list(iter_charts(records, workers, chunksize))
+
+
+if __name__ == "__main__":
+    # the workers need the functions from the package, not from __main__.
+    from kerykeion import bulk
+
+    records = [
+        {"name": "Kanye", "year": 1977, "month": 6, "day": 8, "hours": 8,
+         "minuts": 45, "lon": -84.38, "lat": 33.749,
+         "tz_str": "America/New_York"},
+        ("Jack", 1990, 6, 15, 15, 15, 12.5, 41.9, "Europe/Rome"),
+        ("Wrong", 1990, 6, 15, 15, 15, 12.5, 41.9, "Nowhere/Nothing"),
+    ] * 3
+
+    for result in bulk.compute_charts(records, workers=2, chunksize=2):
+        print(result.index, result.chart and result.chart.sun["sign"],
+              result.error)
@@ -0,0 +1,215 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Caches of calculated charts.
+    ChartCache keeps the compact charts (see kerykeion.compact) in a
+    bounded LRU memory tier and, optionally, in a SQLite file that is
+    kept between restarts. The charts are found by rounded julian day,
+    latitude, longitude and calculation context (zodiac type, ayanamsa,
+    house system): the name is not part of the key, the same sky for
+    another person is the same chart.
+    Every stored chart has the fingerprint of the library and swisseph
+    versions and of the chart layout, the charts with another
+    fingerprint are deleted when the file is opened.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+import swisseph as swe
+from kerykeion import __version__
+from kerykeion.astrocore import PLANETS_NAMES, BodyState
+from kerykeion.compact import CompactChart, birth_data
+
+
+# Rounding of the keys: julian day to the second, coordinates to
+# 4 decimals (about 10 meters).
+JD_RESOLUTION = 86400
+COORDINATES_DECIMALS = 4
+
+
+def fingerprint():
+    """
+    Returns a hash of everything that changes the stored charts:
+    library version, swisseph version and layout of CompactChart.
+    """
+    parts = [__version__, swe.version, ",".join(PLANETS_NAMES),
+             ",".join(BodyState._fields)]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class LRUCache():
+    """
+    Thread safe dictionary with at most maxsize items, adding an item
+    to a full cache removes the least recently used one.
+    Counts the hits and the misses of get().
+    Args: most items kept.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+def chart_key(user):
+    """
+    Returns the cache key of a Calculator: rounded julian day,
+    latitude and longitude and the calculation context.
+    """
+    context = user.context
+    return "|".join([
+        str(round(user.j_day * JD_RESOLUTION)),
+        f"{round(float(user.city_lat), COORDINATES_DECIMALS):.4f}",
+        f"{round(float(user.city_long), COORDINATES_DECIMALS):.4f}",
+        context.zodiactype, str(context.ayanamsa), context.houses_system])
+
+
+class ChartCache():
+    """
+    Cache of compact charts, in memory and optionally on disk.
+    Ex:
+        cache = ChartCache(path="charts.sqlite")
+        chart = cache.chart(CalculatorPosition(...))
+    Args: most charts kept in memory, path of the SQLite file
+    (None for memory only).
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.memory = LRUCache(maxsize)
+        self.path = path
+        self.disk_hits = 0
+        self.misses = 0
+        self.fingerprint = fingerprint()
+        self._db = None
+        self._lock = threading.Lock()
+
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        """Internal function, opens the file and drops the old charts."""
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS charts (key TEXT PRIMARY KEY, "
+                "fingerprint TEXT, j_day REAL, lat REAL, lon REAL, "
+                "points BLOB, codes BLOB)")
+            self._db.execute("DELETE FROM charts WHERE fingerprint != ?",
+                             (self.fingerprint,))
+
+    def get(self, key):
+        """Returns the chart of a key, None if it's not cached."""
+        chart = self.memory.get(key)
+        if chart is not None or self._db is None:
+            return chart
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT j_day, lat, lon, points, codes FROM charts "
+                "WHERE key = ? AND fingerprint = ?",
+                (key, self.fingerprint)).fetchone()
+        if row is None:
+            return None
+
+        j_day, lat, lon, points, codes = row
+        points = np.frombuffer(points, dtype=np.float64).reshape(
+            -1, len(BodyState._fields))
+        codes = np.frombuffer(codes, dtype=np.int8).reshape(len(points), -1)
+        chart = CompactChart(None, j_day, lat, lon, points, codes)
+        self.disk_hits += 1
+        self.memory.put(key, chart)
+        return chart
+
+    def put(self, key, chart):
+        """Stores a chart in memory and on disk."""
+        for array in (chart.points, chart.codes):
+            array.flags.writeable = False
+        self.memory.put(key, chart)
+
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO charts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, self.fingerprint, chart.j_day, chart.lat, chart.lon,
+                     chart.points.tobytes(), chart.codes.tobytes()))
+
+    def chart(self, user):
+        """
+        Returns the compact chart of a Calculator, from the cache
+        or calculating and storing it.
+        The arrays of the cached charts are shared and read only.
+        """
+        key = chart_key(user)
+        chart = self.get(key)
+        if chart is None:
+            self.misses += 1
+            user.get_all()
+            chart = CompactChart.from_calculator(user)
+            self.put(key, chart)
+
+        return CompactChart(user.name, chart.j_day, chart.lat, chart.lon,
+                            chart.points, chart.codes, birth_data(user))
+
+    def clear(self):
+        """Removes all the charts, from memory and from disk."""
+        self.memory.clear()
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM charts")
+
+    def stats(self):
+        """Returns the counters of the cache."""
+        return {"memory_hits": self.memory.hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "memory_size": len(self.memory)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    from kerykeion.astrocore import CalculatorPosition
+
+    cache = ChartCache(maxsize=2)
+    for name in ("Kanye", "Kanye again", "Kanye"):
+        kanye = CalculatorPosition(name, 1977, 6, 8, 8, 45, -84.38, 33.749,
+                                   "America/New_York")
+        print(cache.chart(kanye).sun["abs_pos"])
+    print(cache.stats())
@@ -0,0 +1,325 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Precomputed Chebyshev tables of the bodies of planets_lister(),
+    for fast tropical longitudes and speeds over a fixed date range.
+
+    Every body is split in segments of the same length, the unwrapped
+    longitude of each segment is interpolated with a Chebyshev polynomial
+    through the swisseph positions at the Chebyshev nodes.
+    The speed is the derivative of the polynomial.
+
+    Error bounds:
+    while building, every segment is checked against swe.calc at its
+    ends and at points at most CHECK_STEP (6 hours) apart, and halved
+    (up to MAX_SPLITS times) while the longitude error is over TOLERANCE
+    (1e-5 degrees, 0.036 arc seconds).
+    Near a conjunction with the Sun swisseph adds the light deflection,
+    which changes too fast for the polynomials (and jumps when the
+    planet goes behind the Sun): the segments still over TOLERANCE
+    after the last halving are marked in the file, and positions()
+    calls swe.calc for the julian days inside them.
+    The largest differences of the other segments, times ERROR_MARGIN,
+    are stored in the file and are available as
+    ChebyshevEphemeris.error_bounds (degrees and degrees per day),
+    ChebyshevEphemeris.check() measures the errors on any julian day.
+    Stored bounds over 1900-2100 with the default SEGMENTS, longitude:
+    Sun 1.1e-7 and Moon 7e-9 degrees, the others from 1.3e-5 (Mean
+    Node) to 2e-5 degrees; speed: Sun 6e-6, Moon 2e-4 and Mean Node
+    6e-5 degrees per day, the others from 3e-4 (Pluto) to 7.5e-3
+    (Mercury) and 0.028 (True Node) degrees per day.
+    swe.calc is used on up to 2% of the days for Uranus and the True
+    Node, less than 1% for the other bodies.
+    On 100000 random days the errors stayed under 0.6 times the bounds,
+    except for the True Node: its swisseph longitude has a noise of
+    about 1e-5 degrees, that the polynomials don't follow, so its errors
+    reach the bound (0.8% of the days are over TOLERANCE).
+    Building these tables takes 7-8 minutes on one core, the file
+    is about 12 MB.
+    swisseph returns no speed (nan) for the True Node on some days,
+    those days are skipped when measuring the speed error.
+
+    File format (little endian):
+    header: magic, first julian day, last julian day, number of bodies;
+    one record for every body: id, degree, segments, longitude error
+    bound, speed error bound, offset of the data;
+    the data of every body: the segments boundaries and the coefficients
+    as float64 (one row for every segment), one uint8 for every segment
+    (1 if it is evaluated with swe.calc).
+    The file is opened with a read only memory map, so more processes
+    using the same file share the same memory pages.
+"""
+
+import struct
+import numpy as np
+import swisseph as swe
+from numpy.polynomial import chebyshev
+from kerykeion.astrocore import PLANETS_IDS, get_iflag
+
+
+MAGIC = b"KRCHEB02"
+HEADER = struct.Struct("<8sddi4x")
+BODY = struct.Struct("<iii4xddq")
+
+# Segment length in days and polynomial degree of every body.
+SEGMENTS = {
+    0: (16.0, 11),
+    1: (4.0, 13),
+    2: (8.0, 13),
+    3: (16.0, 12),
+    4: (16.0, 12),
+    5: (32.0, 11),
+    6: (32.0, 11),
+    7: (64.0, 11),
+    8: (64.0, 11),
+    9: (64.0, 11),
+    10: (64.0, 6),
+    11: (2.0, 13),
+}
+
+# Points checked against swisseph in every segment (at least
+# CHECKS_PER_SEGMENT, ends included, at most CHECK_STEP days apart),
+# largest longitude error accepted before halving a segment and
+# most halvings (then the segments over TOLERANCE use swe.calc).
+CHECKS_PER_SEGMENT = 8
+CHECK_STEP = 0.25
+TOLERANCE = 1e-5
+MAX_SPLITS = 3
+
+# The stored error bounds are the largest errors of the checks times
+# ERROR_MARGIN, because between the checks the errors can be larger.
+ERROR_MARGIN = 2.0
+
+
+def _longitudes(body, j_days, iflag):
+    """Internal function, swisseph longitudes and speeds of a body."""
+    lon = np.empty(len(j_days))
+    speed = np.empty(len(j_days))
+    for i, j_day in enumerate(j_days):
+        pos = swe.calc(j_day, body, iflag)[0]
+        lon[i] = pos[0]
+        speed[i] = pos[3]
+    return lon, speed
+
+
+def _unwrap(lon, axis=-1):
+    """Internal function, removes the jumps from 360 to 0 degrees."""
+    return np.rad2deg(np.unwrap(np.deg2rad(lon), axis=axis))
+
+
+def _evaluate(coefficients, x, length):
+    """
+    Internal function, evaluates the rows of coefficients in x (-1, 1)
+    of segments long length days.
+    Returns longitudes in 0-360 and speeds in degrees per day.
+    """
+    b1 = np.zeros(len(x))
+    b2 = np.zeros(len(x))
+    # Clenshaw recurrence, one row of coefficients for every x.
+    for k in range(coefficients.shape[1] - 1, 0, -1):
+        b1, b2 = coefficients[:, k] + 2 * x * b1 - b2, b1
+    lon = coefficients[:, 0] + x * b1 - b2
+
+    derivative = chebyshev.chebder(coefficients, axis=1)
+    d1 = np.zeros(len(x))
+    d2 = np.zeros(len(x))
+    for k in range(derivative.shape[1] - 1, 0, -1):
+        d1, d2 = derivative[:, k] + 2 * x * d1 - d2, d1
+    speed = (derivative[:, 0] + x * d1 - d2) * 2 / length
+
+    return np.mod(lon, 360), speed
+
+
+def _fit_segments(body, starts, lengths, degree, iflag):
+    """
+    Internal function, fits the segments of a body.
+    Returns coefficients, longitude error and speed error of every segment.
+    """
+    nodes = np.sort(chebyshev.chebpts1(degree + 1))
+    j_days = starts[:, None] + (nodes + 1) * lengths[:, None] / 2
+    lon, _ = _longitudes(body, j_days.ravel(), iflag)
+    lon = _unwrap(lon.reshape(j_days.shape))
+
+    # chebfit fits all the segments at once, one for every column.
+    coefficients = chebyshev.chebfit(nodes, lon.T, degree).T.copy()
+
+    # the errors are largest at the ends of the segments (the speed
+    # above all), so the checks include them.
+    n_checks = max(CHECKS_PER_SEGMENT,
+                   int(np.ceil(lengths.max() / CHECK_STEP)) + 1)
+    checks = np.linspace(-1, 1, n_checks)
+    x = np.tile(checks, len(starts))
+    rows = np.repeat(np.arange(len(starts)), len(checks))
+    check_days = starts[rows] + (x + 1) * lengths[rows] / 2
+    fit_lon, fit_speed = _evaluate(coefficients[rows], x, lengths[rows])
+    lon, speed = _longitudes(body, check_days, iflag)
+
+    lon_error = np.abs((fit_lon - lon + 180) % 360 - 180)
+    speed_error = np.abs(fit_speed - speed)
+    speed_error[np.isnan(speed_error)] = 0
+
+    return (coefficients,
+            lon_error.reshape(-1, len(checks)).max(axis=1),
+            speed_error.reshape(-1, len(checks)).max(axis=1))
+
+
+def _fit_body(body, start, end, length, degree, iflag):
+    """
+    Internal function, fits a body with segments of the given length,
+    halving the ones over the TOLERANCE up to MAX_SPLITS times.
+    Returns segments boundaries, coefficients, swe.calc flags of the
+    segments, longitude error bound and speed error bound.
+    """
+    n_segments = int(np.ceil((end - start) / length))
+    starts = start + length * np.arange(n_segments)
+    lengths = np.full(n_segments, length)
+
+    done = []
+    for split in range(MAX_SPLITS + 1):
+        coefficients, lon_err, speed_err = _fit_segments(
+            body, starts, lengths, degree, iflag)
+        bad = lon_err > TOLERANCE
+        if split == MAX_SPLITS:
+            done.append((starts, lengths, coefficients, bad,
+                         np.where(bad, 0, lon_err), np.where(bad, 0, speed_err)))
+            break
+        done.append((starts[~bad], lengths[~bad], coefficients[~bad],
+                     bad[~bad], lon_err[~bad], speed_err[~bad]))
+        if not bad.any():
+            break
+        lengths = np.repeat(lengths[bad] / 2, 2)
+        starts = np.repeat(starts[bad], 2) + np.tile([0, 1], bad.sum()) * lengths
+
+    starts, lengths, coefficients, flags, lon_err, speed_err = (
+        np.concatenate(part) for part in zip(*done))
+    order = np.argsort(starts)
+    boundaries = np.append(starts[order], starts[order][-1] + lengths[order][-1])
+
+    return (boundaries, coefficients[order], flags[order].astype(np.uint8),
+            ERROR_MARGIN * float(lon_err.max()),
+            ERROR_MARGIN * float(speed_err.max()))
+
+
+def build_table(path, start_year=1900, end_year=2100, bodies=None):
+    """
+    Builds the Chebyshev tables file of the bodies (default:
+    all the bodies of planets_lister()) from the first day
+    of start_year to the first day of end_year.
+    Returns the error bounds of every body.
+    """
+    bodies = PLANETS_IDS if bodies is None else bodies
+    start = swe.julday(start_year, 1, 1, 0.0)
+    end = swe.julday(end_year, 1, 1, 0.0)
+    iflag = get_iflag("Tropic")
+
+    fitted = []
+    for body in bodies:
+        length, degree = SEGMENTS[body]
+        fitted.append((body, degree)
+                      + _fit_body(body, start, end, length, degree, iflag))
+
+    offset = HEADER.size + BODY.size * len(fitted)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, start, end, len(fitted)))
+        for (body, degree, boundaries, coefficients, flags,
+             lon_err, speed_err) in fitted:
+            file.write(BODY.pack(body, degree, len(coefficients),
+                                 lon_err, speed_err, offset))
+            offset += boundaries.nbytes + coefficients.nbytes + flags.nbytes
+        for fit in fitted:
+            file.write(fit[2].astype("<f8").tobytes())
+            file.write(fit[3].astype("<f8").tobytes())
+            file.write(fit[4].tobytes())
+
+    return {fit[0]: (fit[5], fit[6]) for fit in fitted}
+
+
+class ChebyshevEphemeris():
+    """
+    Reads a file made with build_table() and evaluates the longitudes
+    and the speeds of the bodies for arrays of julian days.
+    Args: path of the tables file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, "rb") as file:
+            magic, self.start, self.end, n_bodies = HEADER.unpack(
+                file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a Chebyshev tables file.")
+            records = [BODY.unpack(file.read(BODY.size))
+                       for _ in range(n_bodies)]
+
+        self.tables = {}
+        self.error_bounds = {}
+        for body, degree, n_segments, lon_err, speed_err, offset in records:
+            boundaries = np.memmap(path, dtype="<f8", mode="r", offset=offset,
+                                   shape=(n_segments + 1,))
+            coefficients = np.memmap(path, dtype="<f8", mode="r",
+                                     offset=offset + boundaries.nbytes,
+                                     shape=(n_segments, degree + 1))
+            flags = np.memmap(path, dtype=np.uint8, mode="r",
+                              offset=(offset + boundaries.nbytes
+                                      + coefficients.nbytes),
+                              shape=(n_segments,))
+            self.tables[body] = (boundaries, coefficients, flags)
+            self.error_bounds[body] = (lon_err, speed_err)
+
+    def positions(self, body, j_days):
+        """
+        Returns the longitudes and the speeds of a body
+        as arrays with the shape of the julian days.
+        """
+        j_days = np.asarray(j_days, dtype=np.float64)
+        if np.any(j_days < self.start) or np.any(j_days > self.end):
+            raise ValueError(
+                f"Julian days out of the tables range {self.start}-{self.end}.")
+
+        boundaries, coefficients, flags = self.tables[body]
+        flat = j_days.ravel()
+        rows = np.searchsorted(boundaries, flat, side="right") - 1
+        rows = np.minimum(rows, len(coefficients) - 1)
+        lengths = boundaries[rows + 1] - boundaries[rows]
+        x = 2 * (flat - boundaries[rows]) / lengths - 1
+
+        lon, speed = _evaluate(coefficients[rows], x, lengths)
+        exact = np.nonzero(flags[rows])[0]
+        if len(exact):
+            lon[exact], speed[exact] = _longitudes(body, flat[exact],
+                                                   get_iflag("Tropic"))
+        return lon.reshape(j_days.shape), speed.reshape(j_days.shape)
+
+    def planets(self, j_days):
+        """
+        Returns longitudes and speeds of all the bodies in the file,
+        as arrays shaped (julian days, bodies).
+        """
+        results = [self.positions(body, j_days) for body in self.tables]
+        lon = np.stack([r[0] for r in results], axis=-1)
+        speed = np.stack([r[1] for r in results], axis=-1)
+        return lon, speed
+
+    def check(self, body, j_days):
+        """
+        Measures the largest difference between the tables and swe.calc
+        on the julian days, returns longitude error and speed error.
+        """
+        j_days = np.asarray(j_days, dtype=np.float64).ravel()
+        fit_lon, fit_speed = self.positions(body, j_days)
+        lon, speed = _longitudes(body, j_days, get_iflag("Tropic"))
+        return (np.max(np.abs((fit_lon - lon + 180) % 360 - 180)),
+                np.nanmax(np.abs(fit_speed - speed)))
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "kerykeion_chebyshev.bin"
+    print(build_table(path))
+
+    ephemeris = ChebyshevEphemeris(path)
+    days = np.random.uniform(ephemeris.start, ephemeris.end, 2000)
+    for body in ephemeris.tables:
+        print(body, ephemeris.error_bounds[body], ephemeris.check(body, days))
@@ -0,0 +1,258 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Geocoding that keeps working when geonames is slow or down:
+        geocoder = ResilientGeocoder(fallback=GeoIndex("cities.idx").search)
+        user = CalculatorCitySearch(..., geocoder=geocoder.search)
+
+    CircuitBreaker counts the failures (errors and calls slower than
+    slow_call) of the last calls. When too many of them fail the circuit
+    opens: the next calls fail at once, without waiting for the service,
+    for reset_timeout seconds. Then one call at a time is let through
+    (half open): a success closes the circuit, a failure opens it again.
+
+    ResilientGeocoder calls geoname.lookup() (or another geocoder) in a
+    thread pool and waits at most timeout seconds. With hedge_after, a
+    call not answered after that many seconds is sent a second time and
+    the first answer wins. When the call fails, times out or the circuit
+    is open, the fallback geocoder answers (ex: the offline index of
+    kerykeion.geoindex), so a chart never waits more than timeout seconds
+    for the geocoding.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from kerykeion.geoname import lookup
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open."""
+
+
+class CircuitBreaker():
+    """
+    Tracks the failure rate of a service.
+    Args: fraction of failed calls that opens the circuit, number of
+    last calls counted, fewest calls before opening, seconds the circuit
+    stays open, seconds after which a successful call counts as failed
+    (None for no limit), clock function.
+    """
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=5,
+                 reset_timeout=30, slow_call=None, clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.slow_call = slow_call
+        self.clock = clock
+        self.state = CLOSED
+        self.opened = 0
+        self._calls = deque(maxlen=window)
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Returns True if a call can be made now. In the half open state
+        only one call at a time is allowed.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    return False
+                self._trial = True
+            return True
+
+    def record(self, success, duration=0.0):
+        """
+        Records the result of an allowed call. The calls started before
+        the circuit last opened are ignored: they were allowed in a
+        closed period that is over.
+        Args: True if it succeeded, its duration in seconds
+        (measured with the clock of the breaker).
+        """
+        started = self.clock() - duration
+        if self.slow_call is not None and duration > self.slow_call:
+            success = False
+
+        with self._lock:
+            if self._opened_at is not None and started < self._opened_at:
+                return
+            if self.state == HALF_OPEN:
+                self._trial = False
+                if success:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+
+            self._calls.append(success)
+            failures = self._calls.count(False)
+            if len(self._calls) >= self.min_calls and \
+                    failures >= self.failure_rate * len(self._calls):
+                self._open()
+
+    def _open(self):
+        """Internal function, opens the circuit, holding the lock."""
+        self.state = OPEN
+        self.opened += 1
+        self._opened_at = self.clock()
+        self._calls.clear()
+
+    def call(self, func, *args):
+        """
+        Calls a function through the breaker. Returns its result.
+        Raises CircuitOpenError when the circuit is open.
+        """
+        if not self.allow():
+            raise CircuitOpenError("Circuit open, call refused.")
+        start = self.clock()
+        try:
+            result = func(*args)
+        except Exception:
+            self.record(False, self.clock() - start)
+            raise
+        self.record(True, self.clock() - start)
+        return result
+
+
+class ResilientGeocoder():
+    """
+    Geocoder with a circuit breaker, hedged requests and a fallback.
+    Args: geocoder function raising its errors (default:
+    geoname.lookup() with the same timeout), fallback geocoder
+    (None to raise the errors), CircuitBreaker (default: a new one),
+    most seconds waited for an answer, seconds before sending a second
+    request (None for never), threads calling the geocoder.
+    """
+
+    def __init__(self, geocoder=None, fallback=None, breaker=None,
+                 timeout=5, hedge_after=None, workers=8):
+        # the requests of geoname.lookup() stop after timeout seconds too,
+        # so the threads aren't kept by a service that doesn't answer.
+        self.geocoder = partial(lookup, timeout=timeout) if geocoder is None \
+            else geocoder
+        self.fallback = fallback
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0,
+                         "hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+        self._pool = ThreadPoolExecutor(workers)
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        """Internal function, increments a counter, from any thread."""
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _call(self, name, country):
+        """
+        Internal function, calls the geocoder (twice with hedging)
+        waiting at most timeout seconds.
+        Raises the error of the calls or TimeoutError.
+        """
+        deadline = time.monotonic() + self.timeout
+        first = self._pool.submit(self.geocoder, name, country)
+        pending = {first}
+        if self.hedge_after is not None and self.hedge_after < self.timeout:
+            # a first call already finished is picked up by the loop.
+            if not wait(pending, self.hedge_after).done:
+                self._count("hedged")
+                pending.add(self._pool.submit(self.geocoder, name, country))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, max(deadline - time.monotonic(), 0),
+                                 FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+
+        # the calls still running finish in the pool, their results
+        # are dropped.
+        raise error or TimeoutError(
+            f"No answer from the geocoder in {self.timeout} seconds.")
+
+    def _fallback(self, name, country, error):
+        """Internal function, the answer of the fallback or the error."""
+        if self.fallback is None:
+            raise error
+        self._count("fallbacks")
+        return self.fallback(name, country)
+
+    def search(self, name="", country=""):
+        """
+        Searches a city like geoname.search(), from the geocoder or,
+        when it fails or the circuit is open, from the fallback.
+        Args: city name, two letters country code (optional).
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            return self._fallback(name, country,
+                                  CircuitOpenError("Geocoder unavailable."))
+
+        self._count("calls")
+        clock = self.breaker.clock
+        start = clock()
+        try:
+            result = self._call(name, country)
+        except Exception as error:
+            self._count("failures")
+            self.breaker.record(False, clock() - start)
+            return self._fallback(name, country, error)
+
+        self.breaker.record(True, clock() - start)
+        return result
+
+    def stats(self):
+        """Returns the counters and the state of the circuit."""
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, state=self.breaker.state,
+                    opened=self.breaker.opened)
+
+    def close(self):
+        """Stops the threads, without waiting for the running calls."""
+        self._pool.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    import random
+
+    def flaky_search(name, country=""):
+        # slow or failing like a geocoding service in trouble.
+        time.sleep(random.choice([0.01, 0.01, 0.5]))
+        if random.random() < 0.3:
+            raise ConnectionError("service unavailable")
+        return [{"name": name, "timezonestr": "Europe/Rome"}]
+
+    def offline_search(name, country=""):
+        return [{"name": name, "timezonestr": "UTC"}]
+
+    geocoder = ResilientGeocoder(flaky_search, offline_search, timeout=0.3,
+                                 hedge_after=0.05)
+    start = time.monotonic()
+    for _ in range(100):
+        geocoder.search("Roma")
+    print(f"{time.monotonic() - start:.2f} s", geocoder.stats())
+    geocoder.close()
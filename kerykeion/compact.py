@@ -0,0 +1,196 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import datetime
+from collections import namedtuple
+import numpy as np
+import pytz
+from kerykeion.astrocore import PLANETS_NAMES, BodyState, calc_lunar_phase
+from kerykeion.houses import HOUSES_NAMES
+from kerykeion.tzconvert import EPOCH_JD
+from kerykeion.zodiac import ELEMENTS, EMOJIS, QUALITIES, SIGNS, decompose
+
+
+# Attribute names of the Calculator dictionaries, in row order.
+PLANETS_ATTRS = ("sun", "moon", "mercury", "venus", "mars", "jupiter",
+                 "saturn", "uranus", "neptune", "pluto", "mean_node",
+                 "true_node")
+HOUSES_ATTRS = ("first_house", "second_house", "third_house", "fourth_house",
+                "fifth_house", "sixth_house", "seventh_house", "eighth_house",
+                "ninth_house", "tenth_house", "eleventh_house",
+                "twelfth_house")
+
+# Columns of the codes array.
+SIGN, ELEMENT, QUALITY, HOUSE = 0, 1, 2, 3
+
+# Birth data of the chart, read by the svg charts.
+Birth = namedtuple("Birth", ["city", "city_tz", "year", "month", "day",
+                             "hours", "minuts"])
+
+
+def birth_data(user):
+    """Returns the Birth of a Calculator."""
+    return Birth(user.city, user.city_tz, user.year, user.month, user.day,
+                 user.hours, user.minuts)
+
+
+class CompactChart():
+    """
+    Memory efficient copy of a calculated chart.
+    The planets and the houses are stored as one float64 row each
+    (the BodyState fields, houses only use the longitude) and the
+    sign, element, quality and house of every point as small integers.
+    The dictionaries of Calculator (ex: chart.sun["sign"]) are built
+    on access, with the birth data (city, year, ...) the chart can be
+    drawn by MakeSvgInstance too.
+    Args: name, julian day, latitude, longitude, points array,
+    codes array, Birth (optional).
+    """
+
+    __slots__ = ("name", "j_day", "lat", "lon", "points", "codes", "birth")
+
+    def __init__(self, name, j_day, lat, lon, points, codes, birth=None):
+        self.name = name
+        self.j_day = j_day
+        self.lat = lat
+        self.lon = lon
+        self.points = points
+        self.codes = codes
+        self.birth = birth
+
+    @classmethod
+    def from_calculator(cls, user):
+        """
+        Creates the compact chart of a Calculator,
+        calculating it if it's not already done.
+        """
+        if not hasattr(user, "sun"):
+            user.get_all()
+
+        n_planets = len(PLANETS_NAMES)
+        points = np.zeros((n_planets + 12, len(BodyState._fields)))
+        points[:n_planets] = user.planets_state
+        points[n_planets:, 0] = user.houses_degree_ut
+
+        codes = np.empty((n_planets + 12, 4), dtype=np.int8)
+        sign, _, codes[:, ELEMENT], codes[:, QUALITY] = decompose(points[:, 0])
+        codes[:, SIGN] = sign
+        codes[:n_planets, HOUSE] = user.planets_houses
+        codes[n_planets:, HOUSE] = 0
+
+        return cls(user.name, user.j_day, user.city_lat, user.city_long,
+                   points, codes, birth_data(user))
+
+    def _point(self, row, name):
+        """Internal function, builds the dictionary of a point."""
+        abs_pos = float(self.points[row, 0])
+        sign = int(self.codes[row, SIGN])
+        return {
+            "name": name,
+            "quality": QUALITIES[self.codes[row, QUALITY]],
+            "element": ELEMENTS[self.codes[row, ELEMENT]],
+            "sign": SIGNS[sign],
+            "sign_num": sign,
+            "pos": abs_pos - sign * 30,
+            "abs_pos": abs_pos,
+            "emoji": EMOJIS[sign]
+        }
+
+    def planet(self, index):
+        """Returns the dictionary of a planet, like Calculator.sun."""
+        planet = self._point(index, PLANETS_NAMES[index])
+        planet["house"] = HOUSES_NAMES[self.codes[index, HOUSE] - 1]
+        planet["retrograde"] = bool(self.points[index, 3] < 0)
+        return planet
+
+    def house(self, index):
+        """Returns the dictionary of a house, like Calculator.first_house."""
+        return self._point(len(PLANETS_NAMES) + index, str(index + 1))
+
+    @property
+    def planets_list(self):
+        return [self.planet(i) for i in range(len(PLANETS_NAMES))]
+
+    @property
+    def house_list(self):
+        return [self.house(i) for i in range(12)]
+
+    @property
+    def city_lat(self):
+        return self.lat
+
+    @property
+    def city_long(self):
+        return self.lon
+
+    @property
+    def utc(self):
+        """Utc time of the julian day, to the second."""
+        seconds = round((self.j_day - EPOCH_JD) * 86400)
+        return datetime.datetime(1970, 1, 1, tzinfo=pytz.utc) + \
+            datetime.timedelta(seconds=seconds)
+
+    @property
+    def lunar_phase(self):
+        return calc_lunar_phase(float(self.points[0, 0]),
+                                float(self.points[1, 0]))
+
+    @property
+    def planets_state(self):
+        """The BodyState of every planet, like Calculator.planets_state."""
+        return [BodyState(*row) for row in
+                self.points[:len(PLANETS_NAMES)].tolist()]
+
+    @property
+    def planets_degs(self):
+        return self.points[:len(PLANETS_NAMES), 0].tolist()
+
+    @property
+    def houses_degree_ut(self):
+        return self.points[len(PLANETS_NAMES):, 0].tolist()
+
+    @property
+    def houses_degree(self):
+        return [h["pos"] for h in self.house_list]
+
+    def __getattr__(self, name):
+        if name in PLANETS_ATTRS:
+            return self.planet(PLANETS_ATTRS.index(name))
+        if name in HOUSES_ATTRS:
+            return self.house(HOUSES_ATTRS.index(name))
+        if name in Birth._fields and self.birth is not None:
+            return getattr(self.birth, name)
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            object.__setattr__(self, slot, value)
+
+    def to_dict(self):
+        """Returns a json serializable dictionary of the chart."""
+        return {
+            "name": self.name,
+            "j_day": self.j_day,
+            "lat": self.lat,
+            "lon": self.lon,
+            "planets": self.planets_list,
+            "houses": self.house_list
+        }
+
+    def __str__(self):
+        return f"Compact astrological data for: {self.name}, {self.j_day} JD"
+
+
+if __name__ == "__main__":
+    from kerykeion.astrocore import CalculatorPosition
+
+    kanye = CalculatorPosition("Kanye", 1977, 6, 8, 8, 45, -84.38, 33.749,
+                               "America/New_York")
+    chart = CompactChart.from_calculator(kanye)
+    print(chart.sun)
+    print(chart.sun == kanye.sun, chart.house_list == kanye.house_list)
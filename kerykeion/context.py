@@ -0,0 +1,118 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Calculation context: zodiac type, ayanamsa, swisseph flags and
+    house system of a calculation, in one immutable (and hashable)
+    object, so it can be passed to the functions and used in the caches.
+
+    Threads:
+    swisseph keeps the sidereal mode in a global state. When it's built
+    with a process global state, a thread calculating a sidereal chart
+    can be interrupted by another one setting a different mode before
+    the positions are calculated; when it's built with a thread local
+    state (like the pyswisseph wheels), the mode set by a thread
+    (ex: get_iflag() in the main thread) isn't used by the others.
+    swe_calc() sets the mode in the calculating thread and calculates
+    holding SWE_LOCK, so both cases get the right positions.
+    The tropical calculations don't use the mode and don't wait.
+    Any code changing the mode should use set_sid_mode().
+"""
+
+import threading
+from collections import namedtuple
+from functools import lru_cache
+import swisseph as swe
+from kerykeion.houses import check_chart_system
+
+
+ZODIAC_TYPES = ("Tropic", "sidereal")
+
+# Ayanamsa used when none is given, the one of the first versions.
+DEFAULT_AYANAMSA = "FAGAN_BRADLEY"
+
+# Held while the sidereal mode is set and used.
+SWE_LOCK = threading.RLock()
+
+# The thread and the ayanamsa of the last set_sid_mode(), the mode
+# is set again only when one of them changes. Every thread has its own
+# marker object, kept alive here so a new thread can't get its id.
+_thread = threading.local()
+_last_mode = [None, None]
+
+CalcContext = namedtuple("CalcContext", ["zodiactype", "ayanamsa", "flags",
+                                         "houses_system"])
+
+
+@lru_cache(maxsize=256)
+def make_context(zodiactype="Tropic", ayanamsa=DEFAULT_AYANAMSA,
+                 houses_system="P", flags=0):
+    """
+    Creates a calculation context, checking its values.
+    The tropical contexts have no ayanamsa, so they are all equal.
+    Args: zodiac type ("Tropic" or "sidereal"), ayanamsa (the name of a
+    swisseph SIDM_ constant without the prefix, ex: "LAHIRI"),
+    house system (one of kerykeion.houses.CHART_SYSTEMS), swisseph flags added to
+    FLG_SWIEPH and FLG_SPEED.
+    """
+    if zodiactype not in ZODIAC_TYPES:
+        raise ValueError(f"Unknown zodiac type: {zodiactype}")
+    check_chart_system(houses_system)
+
+    flags |= swe.FLG_SWIEPH | swe.FLG_SPEED
+    if zodiactype == "sidereal":
+        if not hasattr(swe, f"SIDM_{ayanamsa}"):
+            raise ValueError(f"Unknown ayanamsa: {ayanamsa}")
+        flags |= swe.FLG_SIDEREAL
+    else:
+        ayanamsa = None
+
+    return CalcContext(zodiactype, ayanamsa, flags, houses_system)
+
+
+def as_context(context):
+    """
+    Returns a calculation context from a context or a zodiac type,
+    for the functions that accept both.
+    """
+    if isinstance(context, CalcContext):
+        return context
+    return make_context(context)
+
+
+def set_sid_mode(ayanamsa):
+    """
+    Sets the swisseph sidereal mode for the calling thread, holding
+    SWE_LOCK. Calculations that need the mode should hold the lock
+    until they are done, like swe_calc().
+    Args: ayanamsa name (ex: "LAHIRI").
+    """
+    with SWE_LOCK:
+        marker = getattr(_thread, "marker", None)
+        if marker is None:
+            marker = _thread.marker = object()
+
+        if _last_mode[0] is not marker or _last_mode[1] != ayanamsa:
+            swe.set_sid_mode(getattr(swe, f"SIDM_{ayanamsa}"))
+            _last_mode[:] = [marker, ayanamsa]
+
+
+def swe_calc(j_day, body, context):
+    """
+    Calculates a body with swe.calc() in a calculation context.
+    Returns the six values of swe.calc().
+    Args: julian day, swisseph body id, calculation context.
+    """
+    if not context.flags & swe.FLG_SIDEREAL:
+        return swe.calc(j_day, body, context.flags)[0]
+
+    with SWE_LOCK:
+        set_sid_mode(context.ayanamsa)
+        return swe.calc(j_day, body, context.flags)[0]
+
+
+if __name__ == "__main__":
+    # the Sun on 2000-01-01 in the tropical and in two sidereal zodiacs.
+    for context in (make_context(), make_context("sidereal"),
+                    make_context("sidereal", "LAHIRI")):
+        print(context.zodiactype, context.ayanamsa,
+              swe_calc(2451544.5, swe.SUN, context)[0])
@@ -0,0 +1,159 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Ephemeris tables: longitude and speed of the bodies of
+    planets_lister() at a fixed step over a time span, calculated in
+    chunks of rows and written to csv, .npy or .npz one chunk at a time,
+    so the memory used doesn't depend on the length of the table.
+    Every row has the julian day and, for every body,
+    its longitude and its speed (see ephemeris_columns()).
+"""
+
+import csv
+import multiprocessing
+import zipfile
+import numpy as np
+from kerykeion.astrocore import PLANETS_IDS, PLANETS_NAMES
+from kerykeion.batch import body_series, to_julian_days
+from kerykeion.bulk import _submit
+from kerykeion.tzconvert import EPOCH_JD
+
+
+# Name of the table inside the .npz files.
+NPZ_TABLE = "ephemeris"
+
+
+def ephemeris_columns(bodies=None):
+    """Returns the names of the columns of a table."""
+    bodies = PLANETS_IDS if bodies is None else bodies
+    columns = ["j_day"]
+    for body in bodies:
+        columns.extend([f"{PLANETS_NAMES[body]}_lon",
+                        f"{PLANETS_NAMES[body]}_speed"])
+    return columns
+
+
+def table_rows(start, end, step):
+    """Returns the number of rows from start (included) to end (excluded)."""
+    if step <= 0:
+        raise ValueError("The step must be positive.")
+    return max(int(np.ceil((end - start) / step - 1e-9)), 0)
+
+
+def _compute_rows(chunk):
+    """
+    Internal function, calculates the rows of a chunk:
+    (start, step, first row, number of rows, bodies, zodiac type).
+    """
+    start, step, first, rows, bodies, zodiactype = chunk
+    table = np.empty((rows, 1 + 2 * len(bodies)))
+    # from the row number, so the steps don't add up rounding errors.
+    table[:, 0] = start + step * np.arange(first, first + rows)
+
+    for column, body in enumerate(bodies):
+        lon, speed = body_series(body, table[:, 0], zodiactype)
+        table[:, 1 + 2 * column] = lon
+        table[:, 2 + 2 * column] = speed
+
+    return table
+
+
+def ephemeris_chunks(start, end, step=1.0, bodies=None, zodiactype="Tropic",
+                     chunk_size=10000, workers=1):
+    """
+    Calculates the ephemeris table from start (included) to end
+    (excluded), yielding arrays of chunk_size rows in time order.
+    Args: start and end (julian days or utc datetimes), step in days
+    (ex: 1 / 24 for hourly rows), swisseph body ids (default: the
+    bodies of planets_lister()), zodiac type, rows of every chunk,
+    number of processes (None for the number of cpus).
+    """
+    start, end = to_julian_days([start, end])
+    bodies = list(PLANETS_IDS if bodies is None else bodies)
+    rows = table_rows(start, end, step)
+
+    chunks = ((start, step, first, min(chunk_size, rows - first), bodies,
+               zodiactype) for first in range(0, rows, chunk_size))
+
+    workers = workers or multiprocessing.cpu_count()
+    if workers == 1:
+        yield from map(_compute_rows, chunks)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from _submit(pool, chunks, 2 * workers, _compute_rows)
+
+
+def _write_csv(file, chunks, columns):
+    """Internal function, writes the chunks as csv with a utc column."""
+    writer = csv.writer(file)
+    writer.writerow(["utc"] + columns)
+    for chunk in chunks:
+        micro = np.round((chunk[:, 0] - EPOCH_JD) * 86400e6)
+        utc = np.datetime_as_string(micro.astype("datetime64[us]"), unit="s")
+        writer.writerows([u] + row for u, row in zip(utc.tolist(),
+                                                     chunk.tolist()))
+
+
+def _write_npy(file, chunks, rows, columns):
+    """
+    Internal function, writes the header of the whole table
+    and then the rows of every chunk.
+    """
+    np.lib.format.write_array_header_1_0(file, {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+        "fortran_order": False,
+        "shape": (rows, len(columns))})
+    for chunk in chunks:
+        file.write(np.ascontiguousarray(chunk, dtype=np.float64).tobytes())
+
+
+def write_ephemeris(path, start, end, step=1.0, bodies=None,
+                    zodiactype="Tropic", chunk_size=10000, workers=1):
+    """
+    Writes the ephemeris table to a file, chosen by the extension:
+    .csv (with a utc column before the julian day), .npy (one float64
+    array) or .npz (the array is named "ephemeris", the column names
+    "columns").
+    Returns the number of rows written.
+    Args: file path, then the arguments of ephemeris_chunks().
+    """
+    start, end = to_julian_days([start, end])
+    rows = table_rows(start, end, step)
+    columns = ephemeris_columns(bodies)
+    chunks = ephemeris_chunks(start, end, step, bodies, zodiactype,
+                              chunk_size, workers)
+
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as file:
+            _write_csv(file, chunks, columns)
+
+    elif path.endswith(".npy"):
+        with open(path, "wb") as file:
+            _write_npy(file, chunks, rows, columns)
+
+    elif path.endswith(".npz"):
+        with zipfile.ZipFile(path, "w", allowZip64=True) as archive:
+            with archive.open(NPZ_TABLE + ".npy", "w",
+                              force_zip64=True) as file:
+                _write_npy(file, chunks, rows, columns)
+            with archive.open("columns.npy", "w") as file:
+                np.lib.format.write_array(file, np.array(columns))
+
+    else:
+        raise ValueError(f"Unknown ephemeris file type: {path}")
+
+    return rows
+
+
+if __name__ == "__main__":
+    # the workers need the functions from the package, not from __main__.
+    from kerykeion import ephemeris
+    import datetime
+
+    start = datetime.datetime(2021, 1, 1)
+    end = datetime.datetime(2022, 1, 1)
+    rows = ephemeris.write_ephemeris("ephemeris_2021.npz", start, end,
+                                     step=1 / 24, workers=2)
+    table = np.load("ephemeris_2021.npz")
+    print(rows, table["ephemeris"].shape, list(table["columns"][:5]))
@@ -0,0 +1,241 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Batch geocoding on the geonames web services, for imports of many
+    birthplaces:
+        client = GeocodingClient(workers=8)
+        for result in client.iter_search(["Roma", ("Paris", "FR"), ...]):
+            ...
+    The requests run in a pool of threads, at most workers at once,
+    on persistent HTTP/1.1 connections reused by the next requests.
+    Network errors, HTTP 429 and 5xx and the geonames "server busy"
+    statuses are retried with exponential backoff and random jitter,
+    the other errors fail the place at once.
+    The results are in the order of the places, a failed place has
+    its error message and doesn't stop the others.
+    The base url can be changed, ex: to test against a local server.
+"""
+
+import http.client
+import queue
+import random
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+from kerykeion.geoname import (HOST, SEARCH_PATH, TIMEZONE_PATH, USERNAME,
+                               _search_params, _search_results,
+                               _timezone_params)
+
+
+DEFAULT_BASE_URL = f"http://{HOST}"
+
+# Geonames error statuses worth retrying: database timeout
+# and server overloaded (see https://www.geonames.org/export/webservice-exception.html).
+RETRY_STATUS = {13, 22}
+
+# Result of a single place: the search result (None if not found)
+# or the error that stopped it.
+GeocodeResult = namedtuple("GeocodeResult",
+                           ["index", "place", "result", "error"])
+
+
+class GeocodingError(Exception):
+    """
+    Error of a request, retryable is True when the same request
+    can succeed if repeated later.
+    """
+
+    def __init__(self, message, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class GeocodingClient():
+    """
+    Geonames client for many searches.
+    Args: base url of the web services, number of requests at once,
+    timeout of every request in seconds, retries of a failed request,
+    first backoff and longest backoff in seconds, geonames username,
+    tz_resolver (see geoname.search()).
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, workers=8, timeout=20,
+                 retries=4, backoff=0.5, max_backoff=30, username=USERNAME,
+                 tz_resolver=None):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported url: {base_url}")
+        self.base_url = base_url
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.username = username
+        self.tz_resolver = tz_resolver
+        self.requests = 0
+        self.retried = 0
+        self.connections = 0
+        self._connection_class = (http.client.HTTPSConnection
+                                  if url.scheme == "https"
+                                  else http.client.HTTPConnection)
+        self._netloc = url.netloc
+        self._prefix = url.path.rstrip("/")
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        """Internal function, a free connection or a new one."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            self.connections += 1
+            return self._connection_class(self._netloc, timeout=self.timeout)
+
+    def _get(self, path, query):
+        """
+        Internal function, makes one GET request on a pooled connection.
+        Returns the parsed xml, raises GeocodingError.
+        """
+        connection = self._connect()
+        self.requests += 1
+        try:
+            connection.request("GET", f"{self._prefix}{path}?{query}",
+                               headers={"User-Agent": "kerykeion"})
+            response = connection.getresponse()
+            body = response.read()
+        except (http.client.HTTPException, OSError) as error:
+            # the connection can be half closed: don't reuse it.
+            connection.close()
+            raise GeocodingError(f"{type(error).__name__}: {error}", True)
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._pool.put(connection)
+
+        if response.status != 200:
+            retry_after = response.getheader("Retry-After")
+            raise GeocodingError(
+                f"HTTP {response.status} {response.reason}",
+                response.status == 429 or response.status >= 500,
+                float(retry_after) if retry_after and retry_after.isdigit()
+                else None)
+
+        try:
+            root = ElementTree.fromstring(body)
+        except ElementTree.ParseError as error:
+            raise GeocodingError(f"Invalid response: {error}")
+
+        status = root.find("status")
+        if status is not None:
+            value = int(status.get("value", "0") or 0)
+            raise GeocodingError(f"Geonames error {value}: "
+                                 f"{status.get('message')}",
+                                 value in RETRY_STATUS)
+        return root
+
+    def _delay(self, attempt, error):
+        """
+        Internal function, seconds to wait before a retry: exponential
+        backoff with full jitter, at least the Retry-After of the server.
+        """
+        delay = random.uniform(0, min(self.max_backoff,
+                                      self.backoff * 2 ** attempt))
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.max_backoff))
+        return delay
+
+    def _request(self, path, query):
+        """Internal function, a request retried while it can succeed."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._get(path, query)
+            except GeocodingError as error:
+                if not error.retryable or attempt == self.retries:
+                    raise
+                self.retried += 1
+                time.sleep(self._delay(attempt, error))
+
+    def search(self, name, country=""):
+        """
+        Searches a city like geoname.search(): returns a list with
+        the first result and its time zone, None if nothing is found.
+        Raises GeocodingError when the requests fail.
+        Args: city name, two letters country code (optional).
+        """
+        if not name:
+            raise ValueError("No name specified!")
+
+        root = self._request(SEARCH_PATH, _search_params(name, country,
+                                                         self.username))
+        total, geoname = _search_results(root)
+        if total == "0" or not geoname:
+            return None
+
+        for place in geoname:
+            if self.tz_resolver is not None:
+                place["timezonestr"] = self.tz_resolver(float(place["lat"]),
+                                                        float(place["lng"]))
+                continue
+            root = self._request(TIMEZONE_PATH, _timezone_params(
+                place["lat"], place["lng"], self.username))
+            place["timezonestr"] = root.findtext(".//timezoneId")
+
+        return geoname
+
+    def _search_place(self, index, place):
+        """Internal function, searches a place catching its error."""
+        name, country = (place, "") if isinstance(place, str) else place
+        try:
+            return GeocodeResult(index, place, self.search(name, country), None)
+        except Exception as error:
+            return GeocodeResult(index, place, None,
+                                 f"{type(error).__name__}: {error}")
+
+    def iter_search(self, places):
+        """
+        Searches many places, yielding a GeocodeResult for every place
+        in the input order. The places are read only when a worker is
+        free, so the memory used doesn't depend on their number.
+        Args: iterable of city names or (name, country code) tuples.
+        """
+        with ThreadPoolExecutor(self.workers) as pool:
+            pending = deque()
+            for index, place in enumerate(places):
+                pending.append(pool.submit(self._search_place, index, place))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def search_many(self, places):
+        """
+        Searches many places. Returns a list of GeocodeResult in the
+        input order, the failed places have the result set to None
+        and the error message.
+        """
+        return list(self.iter_search(places))
+
+    def stats(self):
+        """Returns the counters of the client."""
+        return {"requests": self.requests, "retried": self.retried,
+                "connections": self.connections}
+
+    def close(self):
+        """Closes the pooled connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+if __name__ == "__main__":
+    client = GeocodingClient(workers=4)
+    for result in client.iter_search(["Roma", ("Paris", "FR"), "Atlanta"]):
+        print(result.place, result.result or result.error)
+    print(client.stats())
+    client.close()
@@ -0,0 +1,246 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Cache of the geocoding results, in front of geoname.search() or any
+    function like it (ex: GeoIndex.search of kerykeion.geoindex).
+    Two tiers: a bounded LRU in memory and, optionally, a SQLite table
+    kept between restarts; every result expires after ttl seconds.
+    Concurrent searches of the same place (same normalized name and
+    country) wait for one upstream call and share its result
+    ("single flight"), so a burst of charts for London makes one request.
+    stats() reports the hit ratio and the latency of the upstream calls.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from kerykeion.cache import LRUCache
+from kerykeion.geoindex import normalize
+from kerykeion.geoname import search
+
+
+# Results kept for 30 days, the cities don't move.
+DEFAULT_TTL = 30 * 86400
+
+# Upstream latencies kept for the percentiles of stats().
+LATENCY_SAMPLES = 1000
+
+
+def place_key(name, country=""):
+    """Returns the cache key of a search: normalized name and country."""
+    return f"{normalize(name)}|{country.strip().upper()}"
+
+
+class _Flight():
+    """Internal class, an upstream call the other searches wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GeocodeCache():
+    """
+    Caches the results of a geocoder.
+    Ex:
+        geocoder = GeocodeCache(path="places.sqlite")
+        user = CalculatorCitySearch(..., geocoder=geocoder.search)
+    Args: geocoder function (default: geoname.search), most results kept
+    in memory, path of the SQLite file (None for memory only), seconds
+    a result is valid, seconds a "not found" (None) is valid
+    (0 doesn't cache them: geoname.search() returns None on errors too).
+    """
+
+    def __init__(self, geocoder=None, maxsize=4096, path=None,
+                 ttl=DEFAULT_TTL, negative_ttl=0):
+        self.geocoder = search if geocoder is None else geocoder
+        self.memory = LRUCache(maxsize)
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lookups = 0
+        self.disk_hits = 0
+        self.shared = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_time = 0.0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        """Internal function, opens the file and drops the expired results."""
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS places (key TEXT PRIMARY KEY, "
+                "result TEXT, expires REAL)")
+            self._db.execute("DELETE FROM places WHERE expires < ?",
+                             (time.time(),))
+
+    def _get(self, key):
+        """
+        Internal function, returns (True, result) for a cached key,
+        (False, None) when it's not cached or expired.
+        """
+        now = time.time()
+        item = self.memory.get(key)
+        if item is not None:
+            expires, result = item
+            if expires >= now:
+                return True, result
+            self.memory.pop(key)
+
+        if self._db is None:
+            return False, None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result, expires FROM places WHERE key = ? "
+                "AND expires >= ?", (key, now)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+        if row is None:
+            return False, None
+
+        result = json.loads(row[0])
+        self.memory.put(key, (row[1], result))
+        return True, result
+
+    def _put(self, key, result):
+        """Internal function, stores a result in memory and on disk."""
+        ttl = self.ttl if result is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        self.memory.put(key, (expires, result))
+
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO places VALUES (?, ?, ?)",
+                    (key, json.dumps(result), expires))
+
+    def _call(self, name, country):
+        """Internal function, calls the geocoder measuring the latency."""
+        start = time.perf_counter()
+        try:
+            return self.geocoder(name, country)
+        except Exception:
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.upstream_calls += 1
+                self.upstream_time += latency
+                self._latencies.append(latency)
+
+    def search(self, name="", country=""):
+        """
+        Searches a place like geoname.search(), from the cache when
+        possible. The results are shared: don't change them.
+        Args: city name, two letters country code (optional).
+        """
+        if not name:
+            return self.geocoder(name, country)
+
+        with self._lock:
+            self.lookups += 1
+        key = place_key(name, country)
+        cached, result = self._get(key)
+        if cached:
+            return result
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            # another leader could have finished after the first lookup.
+            cached, flight.result = self._get(key)
+            if not cached:
+                flight.result = self._call(name, country)
+                self._put(key, flight.result)
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+    def stats(self):
+        """
+        Returns the counters of the cache: memory and disk hits, calls
+        shared with a running one, upstream calls and errors, hit ratio
+        (searches without an upstream call)
+        and upstream latency in seconds (mean, median, 95th percentile
+        of the last calls).
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        hits = self.lookups - self.upstream_calls
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(int(fraction * len(latencies)),
+                                 len(latencies) - 1)]
+
+        return {
+            "memory_hits": self.memory.hits, "disk_hits": self.disk_hits,
+            "shared": self.shared, "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "hit_ratio": hits / self.lookups if self.lookups else 0.0,
+            "upstream_mean": (self.upstream_time / self.upstream_calls
+                              if self.upstream_calls else 0.0),
+            "upstream_p50": percentile(0.5), "upstream_p95": percentile(0.95),
+            "memory_size": len(self.memory)}
+
+    def clear(self):
+        """Removes all the results, from memory and from disk."""
+        self.memory.clear()
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM places")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    def slow_search(name, country=""):
+        time.sleep(0.2)
+        return [{"name": name, "lat": "51.50853", "lng": "-0.12574",
+                 "countryCode": country, "timezonestr": "Europe/London"}]
+
+    geocoder = GeocodeCache(slow_search)
+    with ThreadPoolExecutor(20) as pool:
+        list(pool.map(lambda _: geocoder.search("London", "GB"), range(100)))
+    geocoder.search("london ", "gb")
+    print(geocoder.stats())
@@ -0,0 +1,272 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Offline geocoding from a GeoNames dump (ex: cities15000.txt from
+    https://download.geonames.org/export/dump/).
+    build_index() converts the dump to a compact index file: the
+    normalized names (and optionally the alternate names) sorted for a
+    binary search, every one pointing to a city (with the first bytes of
+    the name and the population of the city, for the prefix searches),
+    and the cities data in parallel arrays. GeoIndex opens it with a
+    read only memory map, so only the pages used by the searches are
+    read from disk and the processes using the same file share them.
+    GeoIndex.search() returns the same results as geoname.search(),
+    it can be used as the geocoder of CalculatorCitySearch.
+
+    File format (little endian):
+    header: magic, size of the json table that follows it;
+    json table: time zones, feature codes, country names and the
+    offset, dtype and shape of every array;
+    the arrays, aligned to 8 bytes.
+"""
+
+import json
+import mmap
+import struct
+import unicodedata
+import numpy as np
+
+
+MAGIC = b"KRGEO001"
+HEADER = struct.Struct("<8sq")
+
+# Bytes of the names in key_head: they are stored as big endian
+# integers, which sort like the names, to find ranges of names with
+# numpy.searchsorted (see kerykeion.autocomplete).
+KEY_HEAD = 8
+
+# Columns of the GeoNames dump.
+GEONAMEID, NAME, ASCIINAME, ALTERNATENAMES, LATITUDE, LONGITUDE = range(6)
+FEATURE_CLASS, FEATURE_CODE, COUNTRY_CODE = 6, 7, 8
+POPULATION, TIMEZONE = 14, 17
+
+
+def normalize(name):
+    """
+    Normalizes a place name for the searches: lower case, without
+    accents and with single spaces (ex: "  São   Paulo" -> "sao paulo").
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def _read_countries(path):
+    """Internal function, country names by code from countryInfo.txt."""
+    countries = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.startswith("#") or not line.strip():
+                continue
+            fields = line.rstrip("\n").split("\t")
+            countries[fields[0]] = fields[4]
+    return countries
+
+
+def _blob(strings):
+    """Internal function, joins strings in a bytes array with offsets."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def build_index(cities_path, index_path, country_info_path=None,
+                alternate_names=True):
+    """
+    Builds the index file of a GeoNames cities dump.
+    Returns the number of cities.
+    Args: path of the dump, path of the index, path of countryInfo.txt
+    for the country names (optional), True to find the cities by their
+    alternate names too (ex: "Roma" and "Rom" for Rome).
+    """
+    countries = _read_countries(country_info_path) if country_info_path else {}
+    cities = []
+    with open(cities_path, encoding="utf-8") as file:
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 19:
+                continue
+            cities.append(fields)
+
+    timezones = sorted({c[TIMEZONE] for c in cities})
+    fcodes = sorted({(c[FEATURE_CLASS], c[FEATURE_CODE]) for c in cities})
+    tz_index = {tz: i for i, tz in enumerate(timezones)}
+    fcode_index = {fcode: i for i, fcode in enumerate(fcodes)}
+
+    keys = []
+    for record, city in enumerate(cities):
+        names = {city[NAME], city[ASCIINAME]}
+        if alternate_names and city[ALTERNATENAMES]:
+            names.update(n for n in city[ALTERNATENAMES].split(",")
+                         if n and "://" not in n)
+        population = int(city[POPULATION] or 0)
+        for key in {normalize(n) for n in names} - {""}:
+            keys.append((key.encode("utf-8"), -population, record))
+    # by name, then the most populated first.
+    keys.sort()
+
+    key_offsets, key_blob = _blob([k[0].decode("utf-8") for k in keys])
+    name_offsets, name_blob = _blob([c[NAME] for c in cities])
+    arrays = {
+        "key_offsets": key_offsets,
+        "key_blob": key_blob,
+        "key_record": np.array([k[2] for k in keys], dtype="<i4"),
+        "key_head": np.array([int.from_bytes(k[0][:KEY_HEAD].ljust(
+            KEY_HEAD, b"\0"), "big") for k in keys], dtype="<u8"),
+        "key_population": np.array([-k[1] for k in keys], dtype="<i8"),
+        "name_offsets": name_offsets,
+        "name_blob": name_blob,
+        "geonameid": np.array([int(c[GEONAMEID]) for c in cities], dtype="<i8"),
+        "lat": np.array([float(c[LATITUDE]) for c in cities], dtype="<f8"),
+        "lng": np.array([float(c[LONGITUDE]) for c in cities], dtype="<f8"),
+        "population": np.array([int(c[POPULATION] or 0) for c in cities],
+                               dtype="<i8"),
+        "country": np.array([c[COUNTRY_CODE].encode("ascii") for c in cities],
+                            dtype="S2"),
+        "fcode": np.array([fcode_index[(c[FEATURE_CLASS], c[FEATURE_CODE])]
+                           for c in cities], dtype="<u2"),
+        "timezone": np.array([tz_index[c[TIMEZONE]] for c in cities],
+                             dtype="<u2"),
+    }
+
+    # the offsets depend on the size of the table, which contains them:
+    # repeat until they don't change.
+    table = {"timezones": timezones, "fcodes": fcodes,
+             "countries": countries, "arrays": {}}
+    size = 0
+    while True:
+        start = HEADER.size + size
+        offset = start + (-start) % 8
+        for name, array in arrays.items():
+            table["arrays"][name] = [offset, array.dtype.str, array.shape]
+            offset += array.nbytes + (-array.nbytes) % 8
+        encoded = json.dumps(table).encode("utf-8")
+        if len(encoded) == size:
+            break
+        size = len(encoded)
+
+    with open(index_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, size))
+        file.write(encoded)
+        for name, array in arrays.items():
+            file.seek(table["arrays"][name][0])
+            file.write(array.tobytes())
+
+    return len(cities)
+
+
+class GeoIndex():
+    """
+    Searches the cities of an index file made with build_index().
+    Args: path of the index file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            magic, size = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a geonames index file.")
+            table = json.loads(file.read(size).decode("utf-8"))
+
+        self.timezones = table["timezones"]
+        self.fcodes = table["fcodes"]
+        self.countries = table["countries"]
+        # read only arrays on a memory map of the file: like np.memmap,
+        # without its slower indexing.
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        for name, (offset, dtype, shape) in table["arrays"].items():
+            array = np.frombuffer(self._mmap, dtype=dtype,
+                                  count=int(np.prod(shape)), offset=offset)
+            setattr(self, name, array.reshape(shape))
+
+        # the binary search reads the keys through memoryviews of the same
+        # pages, indexing them is much faster than indexing the arrays
+        # (native byte order, little endian like the file on common cpus).
+        view = memoryview(self._mmap)
+        offset, _, shape = table["arrays"]["key_offsets"]
+        self._key_offsets = view[offset:offset + 4 * shape[0]].cast("I")
+        self._key_start = table["arrays"]["key_blob"][0]
+        offset, _, shape = table["arrays"]["key_record"]
+        self._key_record = view[offset:offset + 4 * shape[0]].cast("i")
+
+    def __len__(self):
+        return len(self.geonameid)
+
+    def _key(self, index):
+        """Internal function, the normalized name of a key as bytes."""
+        start = self._key_start
+        return self._mmap[start + self._key_offsets[index]:
+                          start + self._key_offsets[index + 1]]
+
+    def _lower_bound(self, key):
+        """Internal function, first key not lower than key."""
+        low, high = 0, len(self._key_record)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, name, country=""):
+        """
+        Returns the indexes of the cities named name, the most
+        populated first.
+        Args: name, two letters country code (optional).
+        """
+        key = normalize(name).encode("utf-8")
+        country = country.upper().encode("ascii")
+        found = []
+        index = self._lower_bound(key)
+        while index < len(self._key_record) and self._key(index) == key:
+            record = self._key_record[index]
+            if (not country or self.country[record] == country) \
+                    and record not in found:
+                found.append(record)
+            index += 1
+        return found
+
+    def city(self, record):
+        """Returns a city in the format of geoname.search()."""
+        fcl, fcode = self.fcodes[self.fcode[record]]
+        country = self.country[record].decode("ascii")
+        return {
+            "name": self.name_blob[self.name_offsets[record]:
+                                   self.name_offsets[record + 1]]
+            .tobytes().decode("utf-8"),
+            "lat": str(float(self.lat[record])),
+            "lng": str(float(self.lng[record])),
+            "geonameId": str(int(self.geonameid[record])),
+            "countryCode": country,
+            "countryName": self.countries.get(country, ""),
+            "fcl": fcl,
+            "fcode": fcode,
+            "timezonestr": self.timezones[self.timezone[record]],
+        }
+
+    def search(self, name="", country="", max_rows=1):
+        """
+        Searches a city like geoname.search(): returns a list with
+        the most populated city with that name, None if none is found.
+        Args: city name, two letters country code (optional),
+        number of cities returned.
+        """
+        if not name:
+            return None
+        found = self.find(name, country)
+        if not found:
+            return None
+        return [self.city(record) for record in found[:max_rows]]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m kerykeion.geoindex cities15000.txt cities.idx [countryInfo.txt]
+    print(build_index(*sys.argv[1:4]), "cities")
+    index = GeoIndex(sys.argv[2])
+    print(index.search("Roma", "IT"))
@@ -27,83 +27,133 @@ preset vars:
 
 from urllib.request import urlopen
 from urllib.parse import urlencode
-from xml.dom.minidom import parseString
-from socket import timeout
+from xml.etree import ElementTree
+import socket
 from urllib.error import HTTPError, URLError
 
+# Geonames web services, the requests need a username.
+HOST = "api.geonames.org"
+USERNAME = "century.boy"
+SEARCH_PATH = "/search"
+TIMEZONE_PATH = "/timezone"
 
-def _getText(nodelist):
-	"""Internal function to return text from nodes
+# Fields of the geonames returned by search().
+GEONAME_FIELDS = ('name','lat','lng','geonameId','countryCode','countryName','fcl','fcode')
+
+class GeonamesError(Exception):
+	"""Error status returned by the geonames web services
+	(see https://www.geonames.org/export/webservice-exception.html).
+	"""
+
+	def __init__(self, message, value=0):
+		super().__init__(message)
+		self.value = value
+
+def _search_params(name, country, username=USERNAME):
+	"""Internal function, query string of a search."""
+	return urlencode({'q': name,'country':country,'maxRows':1,'featureClass':'P','username': username})
+
+def _timezone_params(lat, lng, username=USERNAME):
+	"""Internal function, query string of a time zone request."""
+	return urlencode({'lat':lat,'lng':lng,'username':username})
+
+def _search_results(root):
+	"""Internal function, returns the total results count
+	and the first geoname of a parsed search response.
+	"""
+	totalResultsCount = root.findtext("totalResultsCount")
+
+	geoname=[]
+	for i in root.iter("geoname"):
+		geoname.append({key: i.findtext(key, "") for key in GEONAME_FIELDS})
+		break
+
+	return totalResultsCount, geoname
+
+def _parse(data):
+	"""Internal function, parses a response,
+	raises GeonamesError for an error status.
+	"""
+	root = ElementTree.fromstring(data)
+	status = root.find("status")
+	if status is not None:
+		value = int(status.get("value", "0") or 0)
+		raise GeonamesError("Geonames error %s: %s" % (value, status.get("message")), value)
+	return root
+
+def _parse_search(data):
+	"""Internal function, returns the total results count
+	and the first geoname of a search response.
+	"""
+	return _search_results(_parse(data))
+
+def _parse_timezone(data):
+	"""Internal function, returns the time zone of a timezone response.
+	"""
+	return _parse(data).findtext(".//timezoneId")
+
+def _fetch(path, params, timeout):
+	"""Internal function, returns the body of a geonames response.
 	"""
-	rc = ""
-	for node in nodelist:
-		if node.nodeType == node.TEXT_NODE:
-			rc = rc + node.data
-	return rc
+	f = urlopen("http://%s%s?%s" % (HOST, path, params), timeout=timeout)
+	try:
+		return f.read()
+	finally:
+		f.close()
+
+def lookup(name, country='', tz_resolver=None, timeout=20):
+	"""Like search(), but the errors are raised: HTTPError, URLError,
+	socket.timeout (after timeout seconds for every request) or
+	GeonamesError (ex: the daily limit of the username is over).
+	Returns None only when nothing is found.
+	"""
+	if name == '':
+		raise ValueError('No name specified!')
+
+	totalResultsCount, geoname = _parse_search(
+		_fetch(SEARCH_PATH, _search_params(name, country), timeout))
+	if totalResultsCount == "0" or not geoname:
+		return None
+
+	for place in geoname:
+		#get timezone
+		if tz_resolver is not None:
+			place['timezonestr']=tz_resolver(float(place['lat']), float(place['lng']))
+			continue
+		tparams = _timezone_params(place['lat'], place['lng'])
+		place['timezonestr']=_parse_timezone(_fetch(TIMEZONE_PATH, tparams, timeout))
 
-def search(name='',country=''):
+	return geoname
+
+def search(name='',country='',tz_resolver=None,timeout=20):
 	
 	"""Search function for geonames.org api
 		name must be supplied
 		country is optional, 2 character country code
+		tz_resolver is optional, a function giving the time zone of
+		latitude and longitude (ex: TimezoneIndex(...).timezone_at,
+		see kerykeion.tzindex) used instead of the timezone request
+		timeout is the most seconds waited for every request
 	"""
 	#check name
 	if name == '':
 		print('No name specified!')
 		return None
-		
-	#open connection and read xml
-	params = urlencode({'q': name,'country':country,'maxRows':1,'featureClass':'P','username': 'century.boy'})
 
 	try:
-		f = urlopen("http://api.geonames.org/search?%s" % params, timeout=20)
+		geoname = lookup(name, country, tz_resolver, timeout)
 
-	except (HTTPError, URLError) as error:
-		print('Errir: not retrieved because %s\nURL: %s', error, f)
+	except (HTTPError, URLError, GeonamesError) as error:
+		print('Error: not retrieved because %s' % error)
+		return None
 
-	except timeout:
+	except socket.timeout:
 		print('Timeout on search!')
 		return None
-	
-	data = f.read()
-	dom = parseString(data)
 
-	#totalResultsCount
-	totalResultsCount = _getText(dom.getElementsByTagName("totalResultsCount")[0].childNodes)
-	
-	#geoname
-	geoname=[]
-	for i in dom.getElementsByTagName("geoname"):
-		geoname.append({})
-		geoname[-1]['name']=_getText(i.getElementsByTagName("name")[0].childNodes)
-		geoname[-1]['lat']=_getText(i.getElementsByTagName("lat")[0].childNodes)
-		geoname[-1]['lng']=_getText(i.getElementsByTagName("lng")[0].childNodes)
-		geoname[-1]['geonameId']=_getText(i.getElementsByTagName("geonameId")[0].childNodes)
-		geoname[-1]['countryCode']=_getText(i.getElementsByTagName("countryCode")[0].childNodes)
-		geoname[-1]['countryName']=_getText(i.getElementsByTagName("countryName")[0].childNodes)
-		geoname[-1]['fcl']=_getText(i.getElementsByTagName("fcl")[0].childNodes)
-		geoname[-1]['fcode']=_getText(i.getElementsByTagName("fcode")[0].childNodes)
-		#get timezone
-		tparams = urlencode({'lat':geoname[-1]['lat'],'lng':geoname[-1]['lng'],'username':'century.boy'})		
-		try:
-			f = urlopen("http://api.geonames.org/timezone?%s" % tparams, timeout=20)
-		except (HTTPError, URLError) as error:
-			print('Errir: not retrieved because %s\nURL: %s', error, f)
-		except timeout:
-			print('Timeout on search!')
-			return None
-
-		data = f.read()
-		tdom = parseString(data)
-		geoname[-1]['timezonestr']=_getText(tdom.getElementsByTagName("timezoneId")[0].childNodes)
-		tdom.unlink()
-		break
-	#close dom
-	dom.unlink()
-	
 	#return results
-	if totalResultsCount == "0":
+	if geoname is None:
 		print("No results!")
 		return None
 	else:
-		return geoname
\ No newline at end of file
+		return geoname
@@ -0,0 +1,169 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    House cusps and angles for single charts and for arrays of instants
+    and locations, with any swisseph house system.
+
+    Polar latitudes:
+    Placidus, Koch and Gauquelin are not defined where part of the
+    ecliptic never rises (inside the polar circles, about 66.5 degrees),
+    there swisseph can't calculate them. Instead of moving the chart to
+    66 degrees, the houses of those charts are calculated at the real
+    latitude with POLAR_FALLBACK (Porphyry, which only needs Ascendant
+    and Midheaven) and the system used is returned with the cusps.
+
+    Gauquelin has 36 sectors instead of 12 houses: calc_houses() and
+    houses_grid() return them (without a polar fallback, no other system
+    has 36 cusps), the charts accept only the CHART_SYSTEMS.
+"""
+
+from bisect import bisect_left
+import numpy as np
+import swisseph as swe
+
+
+HOUSES_SYSTEMS = {
+    "P": "Placidus",
+    "K": "Koch",
+    "O": "Porphyry",
+    "R": "Regiomontanus",
+    "C": "Campanus",
+    "E": "Equal",
+    "W": "Whole Sign",
+    "B": "Alcabitus",
+    "M": "Morinus",
+    "T": "Polich/Page",
+    "X": "Meridian",
+    "G": "Gauquelin",
+}
+
+# Systems with 12 houses, the ones the charts can use.
+CHART_SYSTEMS = tuple(s for s in HOUSES_SYSTEMS if s != "G")
+
+# Systems swisseph can't calculate inside the polar circles.
+POLAR_SYSTEMS = ("P", "K", "G")
+POLAR_FALLBACK = "O"
+
+# Angles returned with the cusps.
+ANGLES = ("Asc", "Mc", "Armc", "Vertex")
+
+# Names of the house numbers, for presentation.
+HOUSES_NAMES = ("1st House", "2nd House", "3rd House", "4th House",
+                "5th House", "6th House", "7th House", "8th House",
+                "9th House", "10th House", "11th House", "12th House")
+
+
+def _cusps_number(hsys):
+    """Internal function, Gauquelin has 36 sectors, the others 12 houses."""
+    return 36 if hsys == "G" else 12
+
+
+def check_chart_system(hsys):
+    """
+    Returns the house system of a chart,
+    raises ValueError if it's not one of the CHART_SYSTEMS.
+    """
+    if hsys not in CHART_SYSTEMS:
+        raise ValueError(f"Unsupported house system for a chart: {hsys}")
+    return hsys
+
+
+def calc_houses(j_day, lat, lon, hsys="P", fallback=POLAR_FALLBACK):
+    """
+    Calculates the house cusps and the angles of a chart.
+    Returns cusps, angles (see ANGLES) and the house system used,
+    which is the fallback when hsys can't be calculated at the latitude.
+    Args: julian day, latitude, longitude, house system (see HOUSES_SYSTEMS),
+    fallback system for polar latitudes (None to raise the swisseph error).
+    """
+    if hsys not in HOUSES_SYSTEMS:
+        raise ValueError(f"Unknown house system: {hsys}")
+
+    try:
+        cusps, ascmc = swe.houses(j_day, lat, lon, hsys.encode())
+    except swe.Error:
+        if hsys not in POLAR_SYSTEMS or fallback is None:
+            raise
+        hsys = fallback
+        cusps, ascmc = swe.houses(j_day, lat, lon, hsys.encode())
+
+    return cusps[:_cusps_number(hsys)], ascmc[:len(ANGLES)], hsys
+
+
+def houses_grid(j_days, lats, lons, hsys="P", fallback=POLAR_FALLBACK):
+    """
+    Calculates the house cusps and the angles for arrays of julian days,
+    latitudes and longitudes, broadcast together like NumPy does.
+    Ex: one instant over a grid of locations:
+        houses_grid(j_day, lats[:, None], lons[None, :])
+    or many instants at one location:
+        houses_grid(j_days, lat, lon)
+    Returns cusps shaped (..., 12) (36 for Gauquelin), angles shaped
+    (..., 4) and a boolean array, True where the fallback system was used.
+    Args: julian days, latitudes, longitudes, house system,
+    fallback system for polar latitudes (None for Gauquelin).
+    """
+    if fallback is not None and hsys in POLAR_SYSTEMS and \
+            _cusps_number(fallback) != _cusps_number(hsys):
+        raise ValueError(
+            f"The fallback system {fallback} has a different number of "
+            f"cusps than {hsys}, use fallback=None.")
+
+    j_days, lats, lons = np.broadcast_arrays(
+        np.asarray(j_days, dtype=np.float64),
+        np.asarray(lats, dtype=np.float64),
+        np.asarray(lons, dtype=np.float64))
+
+    cusps = np.empty(j_days.shape + (_cusps_number(hsys),))
+    angles = np.empty(j_days.shape + (len(ANGLES),))
+    used_fallback = np.zeros(j_days.shape, dtype=bool)
+
+    for index in np.ndindex(j_days.shape):
+        chart_cusps, chart_angles, system = calc_houses(
+            j_days[index], lats[index], lons[index], hsys, fallback)
+        if system != hsys:
+            used_fallback[index] = True
+        cusps[index] = chart_cusps
+        angles[index] = chart_angles
+
+    return cusps, angles, used_fallback
+
+
+def house_index(cusps, deg):
+    """
+    Finds the house of a point with a binary search on the cusps
+    unwrapped from the first one.
+    A point on a cusp belongs to the house before it.
+    Returns the house number from 1 to 12.
+    Args: house cusps in 360°, point in 360°.
+    """
+    first = cusps[0]
+    unwrapped = [(cusp - first) % 360 for cusp in cusps]
+    return max(bisect_left(unwrapped, (deg - first) % 360), 1)
+
+
+def assign_houses(cusps, degs):
+    """
+    Finds the houses of many points in many charts, like house_index().
+    Returns the house numbers from 1 to 12 as int8, shaped like degs.
+    Args: house cusps shaped (charts, 12), points shaped (charts, bodies).
+    """
+    cusps = np.asarray(cusps, dtype=np.float64)
+    first = cusps[..., :1]
+    unwrapped = (cusps - first) % 360
+    points = (np.asarray(degs, dtype=np.float64) - first) % 360
+
+    # number of cusps before the point, the same as bisect_left.
+    index = np.sum(unwrapped[..., None, :] < points[..., :, None], axis=-1)
+    return np.maximum(index, 1).astype(np.int8)
+
+
+if __name__ == "__main__":
+    j_day = swe.julday(2020, 6, 21, 12.0)
+    lats = np.arange(-80, 81, 20)
+    lons = np.arange(-180, 180, 60)
+
+    cusps, angles, used_fallback = houses_grid(j_day, lats[:, None],
+                                               lons[None, :])
+    print(cusps.shape, angles.shape)
+    print(used_fallback.any(axis=1))
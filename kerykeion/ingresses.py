@@ -0,0 +1,253 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Sign ingresses and stations of the bodies of planets_lister().
+    Every body is sampled with the steps of kerykeion.transits, the
+    stations are refined where the speed changes sign and the ingresses
+    where the longitude crosses a multiple of 30 degrees.
+    The events are calculated one year (utc) at a time, EventTable keeps
+    the years in memory and can save them to a json file, so "when does
+    Mercury go retrograde next" or "in which sign was Venus on a date"
+    are lookups in the table.
+"""
+
+import json
+import os.path
+from bisect import bisect_right
+from collections import namedtuple
+import numpy as np
+import swisseph as swe
+from kerykeion.astrocore import PLANETS_IDS, PLANETS_NAMES
+from kerykeion.batch import body_series, to_julian_days
+from kerykeion.context import as_context, swe_calc
+from kerykeion.lunations import jd_to_utc
+from kerykeion.rootfind import bracket_crossings, refine_root, wrap180
+from kerykeion.transits import STEPS, find_stations
+from kerykeion.zodiac import SIGNS
+
+
+# Increase it when the events change, older json files are recalculated.
+TABLE_VERSION = 1
+
+# Event names, the stations are named after the motion that follows.
+INGRESS = "ingress"
+RETROGRADE = "retrograde"
+DIRECT = "direct"
+
+Event = namedtuple("Event", ["j_day", "utc", "body", "event", "sign",
+                             "abs_pos", "retrograde"])
+
+
+def find_events(body, start, end, zodiactype="Tropic"):
+    """
+    Finds the sign ingresses and the stations of a body.
+    Returns a list of Event sorted by time.
+    Args: swisseph body id (see PLANETS_IDS), first and last
+    julian day, zodiac type.
+    """
+    step = STEPS[body]
+    j_days = np.arange(start - step, end + 2 * step, step)
+    lon, speed = body_series(body, j_days, zodiactype)
+    stations = find_stations(body, j_days, speed, zodiactype)
+
+    events = []
+    if stations:
+        station_lon, _ = body_series(body, stations, zodiactype)
+        for j_day, abs_pos in zip(stations, station_lon):
+            # The speed is 0 at the station, the motion that follows
+            # has the opposite sign of the speed at the sample before.
+            before = speed[np.searchsorted(j_days, j_day) - 1]
+            events.append((j_day, DIRECT if before < 0 else RETROGRADE,
+                           abs_pos))
+
+        # With the stations in the samples the longitude is monotonic
+        # between two samples, every ingress is bracketed once.
+        order = np.argsort(np.concatenate([j_days, stations]), kind="stable")
+        j_days = np.concatenate([j_days, stations])[order]
+        lon = np.concatenate([lon, station_lon])[order]
+
+    context = as_context(zodiactype)
+    for cusp in range(0, 360, 30):
+        values = wrap180(lon - cusp)
+
+        def func(j_day):
+            pos = swe_calc(j_day, body, context)
+            return wrap180(pos[0] - cusp), pos[3]
+
+        for i in bracket_crossings(values):
+            j_day = refine_root(func, j_days[i], j_days[i + 1],
+                                values[i], values[i + 1])
+            events.append((j_day, INGRESS, float(cusp)))
+
+    result = []
+    for j_day, event, abs_pos in sorted(events):
+        if not start <= j_day < end:
+            continue
+        if event == INGRESS:
+            retrograde = swe_calc(j_day, body, context)[3] < 0
+            # Going back, the body enters the sign before the cusp.
+            sign_num = int(abs_pos // 30 - retrograde) % 12
+        else:
+            retrograde = event == RETROGRADE
+            sign_num = int(abs_pos // 30) % 12
+        result.append(Event(float(j_day), jd_to_utc(j_day), PLANETS_NAMES[body],
+                            event, SIGNS[sign_num], float(abs_pos),
+                            bool(retrograde)))
+
+    return result
+
+
+def year_bounds(year):
+    """Returns the julian days of the first instant of a year and of the next."""
+    return swe.julday(year, 1, 1, 0.0), swe.julday(year + 1, 1, 1, 0.0)
+
+
+class EventTable():
+    """
+    Table of the ingresses and the stations of all the bodies,
+    calculated one year at a time when first needed.
+    Every year also stores the sign of the bodies
+    at its start, to answer sign_at() without scanning older years.
+    Args: path of a json file to load and save (optional),
+    zodiac type.
+    """
+
+    def __init__(self, path=None, zodiactype="Tropic"):
+        self.path = path
+        self.zodiactype = zodiactype
+        self.years = {}
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def year(self, year):
+        """
+        Returns the table of a year: a dictionary with the signs
+        at the start of the year ("start_signs", by body name)
+        and the events of all the bodies ("events", sorted by time).
+        """
+        if year not in self.years:
+            start, end = year_bounds(year)
+            events = []
+            for body in PLANETS_IDS:
+                events.extend(find_events(body, start, end, self.zodiactype))
+
+            start_signs = {}
+            for body in PLANETS_IDS:
+                lon, _ = body_series(body, [start], self.zodiactype)
+                start_signs[PLANETS_NAMES[body]] = SIGNS[int(lon[0] // 30) % 12]
+
+            self.years[year] = {"start_signs": start_signs,
+                                "events": sorted(events)}
+
+        return self.years[year]
+
+    def events(self, start, end, bodies=None, kinds=None):
+        """
+        Returns the events between two instants.
+        Args: start, end (julian days or utc datetimes), body names
+        (default: all), event names (INGRESS, RETROGRADE, DIRECT).
+        """
+        start, end = to_julian_days([start, end])
+        first = swe.revjul(start)[0]
+        last = swe.revjul(end)[0]
+
+        found = []
+        for year in range(first, last + 1):
+            for event in self.year(year)["events"]:
+                if not start <= event.j_day < end:
+                    continue
+                if bodies is not None and event.body not in bodies:
+                    continue
+                if kinds is not None and event.event not in kinds:
+                    continue
+                found.append(event)
+
+        return found
+
+    def next_event(self, body, after, kind=RETROGRADE, max_years=50):
+        """
+        Returns the first event of a kind for a body after an instant,
+        None if there is none in max_years years.
+        Ex: table.next_event("Mercury", datetime.datetime.utcnow())
+        Args: body name, julian day or utc datetime, event name,
+        years to search.
+        """
+        after = float(to_julian_days([after])[0])
+        first = swe.revjul(after)[0]
+
+        for year in range(first, first + max_years):
+            for event in self.year(year)["events"]:
+                if event.j_day > after and event.body == body \
+                        and event.event == kind:
+                    return event
+
+        return None
+
+    def sign_at(self, body, when):
+        """
+        Returns the sign of a body at an instant, from the last
+        ingress before it or from the start of the year.
+        Args: body name, julian day or utc datetime.
+        """
+        when = float(to_julian_days([when])[0])
+        table = self.year(swe.revjul(when)[0])
+
+        ingresses = [e for e in table["events"]
+                     if e.body == body and e.event == INGRESS]
+        index = bisect_right([e.j_day for e in ingresses], when)
+        if index:
+            return ingresses[index - 1].sign
+        return table["start_signs"][body]
+
+    def load(self, path):
+        """
+        Loads the years saved in a json file,
+        ignored if saved by another version or zodiac type.
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        if data.get("version") != TABLE_VERSION or \
+                data.get("zodiactype") != self.zodiactype:
+            return
+
+        for year, table in data["years"].items():
+            self.years[int(year)] = {
+                "start_signs": table["start_signs"],
+                "events": [Event(j_day, jd_to_utc(j_day), *fields)
+                           for j_day, *fields in table["events"]]
+            }
+
+    def save(self, path=None):
+        """Saves the calculated years to a json file."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save the event table.")
+
+        data = {
+            "version": TABLE_VERSION,
+            "zodiactype": self.zodiactype,
+            "years": {
+                str(year): {
+                    "start_signs": table["start_signs"],
+                    "events": [[e.j_day, e.body, e.event, e.sign, e.abs_pos,
+                                e.retrograde] for e in table["events"]]
+                } for year, table in sorted(self.years.items())
+            }
+        }
+
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+if __name__ == "__main__":
+    import datetime
+
+    table = EventTable()
+    now = datetime.datetime(2021, 1, 1)
+    print(table.next_event("Mercury", now))
+    print(table.sign_at("Venus", now))
+    for event in table.events(now, datetime.datetime(2021, 3, 1),
+                              bodies=["Sun", "Mercury"]):
+        print(event.utc, event.body, event.event, event.sign)
@@ -0,0 +1,113 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Exact times of the lunar phases.
+    The Sun-Moon elongation (the "degrees_between_s_m" of the lunar
+    phase) is sampled every STEP days, every crossing of a phase angle
+    is then refined with a root solver on the swisseph longitudes.
+    The results are cached per year.
+"""
+
+import datetime
+from collections import namedtuple
+from functools import lru_cache
+import numpy as np
+import swisseph as swe
+from kerykeion.batch import body_series
+from kerykeion.context import as_context, swe_calc
+from kerykeion.rootfind import bracket_crossings, refine_root, wrap180
+
+
+# The elongation grows about 12 degrees per day, a phase angle
+# is crossed once every 29.5 days.
+STEP = 1.0
+
+# The 28 phases of Calculator.lunar_phase_calc(), phase n starts at
+# (n - 1) * 360 / 28 degrees; phases 1, 8, 15 and 22 start at the
+# new moon, first quarter, full moon and last quarter.
+PHASES_NUMBER = 28
+MAIN_PHASES = {1: "New Moon", 8: "First Quarter", 15: "Full Moon",
+               22: "Last Quarter"}
+
+Lunation = namedtuple("Lunation", ["j_day", "utc", "moon_phase", "name",
+                                   "angle"])
+
+
+def elongation(j_day, zodiactype="Tropic"):
+    """
+    Returns the anti-clockwise degrees between Sun and Moon
+    and their change in degrees per day.
+    """
+    context = as_context(zodiactype)
+    sun = swe_calc(j_day, 0, context)
+    moon = swe_calc(j_day, 1, context)
+    return (moon[0] - sun[0]) % 360, moon[3] - sun[3]
+
+
+def jd_to_utc(j_day):
+    """Converts a julian day to a naive utc datetime."""
+    year, month, day, hours = swe.revjul(j_day)
+    return (datetime.datetime(year, month, day)
+            + datetime.timedelta(hours=hours))
+
+
+def find_lunations(start, end, phases=None):
+    """
+    Finds the exact start of the lunar phases between two julian days.
+    Returns a list of Lunation sorted by time.
+    Args: first julian day, last julian day, phase numbers from 1 to 28
+    (default: the four main phases).
+    """
+    phases = sorted(MAIN_PHASES) if phases is None else phases
+
+    grid = np.arange(start - STEP, end + 2 * STEP, STEP)
+    sun, _ = body_series(0, grid)
+    moon, _ = body_series(1, grid)
+    elongations = (moon - sun) % 360
+
+    lunations = []
+    for phase in phases:
+        angle = (phase - 1) * 360 / PHASES_NUMBER
+        values = wrap180(elongations - angle)
+
+        def func(j_day):
+            value, speed = elongation(j_day)
+            return wrap180(value - angle), speed
+
+        for i in bracket_crossings(values):
+            j_day = refine_root(func, grid[i], grid[i + 1],
+                                values[i], values[i + 1])
+            if start <= j_day < end:
+                lunations.append(Lunation(
+                    j_day, jd_to_utc(j_day), phase,
+                    MAIN_PHASES.get(phase, f"Phase {phase}"), angle))
+
+    return sorted(lunations)
+
+
+@lru_cache(maxsize=512)
+def lunations_for_year(year, all_phases=False):
+    """
+    Returns the lunations of a year (utc) as a tuple of Lunation,
+    only the main phases or all the 28 phases. The years are cached.
+    """
+    phases = range(1, PHASES_NUMBER + 1) if all_phases else None
+    start = swe.julday(year, 1, 1, 0.0)
+    end = swe.julday(year + 1, 1, 1, 0.0)
+    return tuple(find_lunations(start, end, phases))
+
+
+def lunar_calendar(start_year, end_year, all_phases=False):
+    """
+    Returns the lunations from the first day of start_year
+    to the last day of end_year, using the cache of every year.
+    """
+    calendar = []
+    for year in range(start_year, end_year + 1):
+        calendar.extend(lunations_for_year(year, all_phases))
+    return calendar
+
+
+if __name__ == "__main__":
+    for lunation in lunar_calendar(2021, 2021)[:8]:
+        print(lunation.utc, lunation.name)
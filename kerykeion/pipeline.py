@@ -0,0 +1,93 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import csv
+import json
+from kerykeion.bulk import iter_charts
+
+
+INT_FIELDS = ("year", "month", "day", "hours", "minuts")
+FLOAT_FIELDS = ("lon", "lat")
+
+
+def _convert(record):
+    """
+    Internal function, converts the values read from a csv file
+    and drops the empty ones.
+    """
+    converted = {}
+    for key, value in record.items():
+        if value is None or value == "":
+            continue
+        if key in INT_FIELDS:
+            value = int(value)
+        elif key in FLOAT_FIELDS:
+            value = float(value)
+        converted[key] = value
+    return converted
+
+
+def read_records(path):
+    """
+    Reads the birth records one at a time from a csv file (with the
+    arguments of CalculatorPosition or CalculatorCitySearch as header)
+    or from a jsonl file (one dictionary for every line).
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.endswith(".csv"):
+            for record in csv.DictReader(file):
+                yield _convert(record)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def result_to_json(result):
+    """Converts a BulkResult to a line of jsonl."""
+    return json.dumps({
+        "index": result.index,
+        "chart": result.chart.to_dict() if result.chart else None,
+        "error": result.error
+    }, ensure_ascii=False)
+
+
+def write_jsonl(results, path):
+    """
+    Writes the results to a jsonl file as they arrive.
+    Returns the number of charts written and of failed records.
+    """
+    written = failed = 0
+    with open(path, "w", encoding="utf-8") as file:
+        for result in results:
+            file.write(result_to_json(result) + "\n")
+            if result.error is None:
+                written += 1
+            else:
+                failed += 1
+    return written, failed
+
+
+def run_pipeline(input_path, output_path, workers=None, chunksize=100,
+                 max_pending=None):
+    """
+    Reads the birth records from a csv or jsonl file, calculates
+    the charts and writes them to a jsonl file in the input order.
+    Only max_pending chunks are in memory at once, so big files
+    are processed with flat memory usage.
+    Returns the number of charts written and of failed records.
+    Args: input path, output path, number of processes, records sent
+    to a worker at once, chunks waiting to be written.
+    """
+    records = read_records(input_path)
+    results = iter_charts(records, workers, chunksize, max_pending)
+    return write_jsonl(results, output_path)
+
+
+if __name__ == "__main__":
+    import sys
+    # the workers need the functions from the package, not from __main__.
+    from kerykeion import pipeline
+
+    print(pipeline.run_pipeline(sys.argv[1], sys.argv[2]))
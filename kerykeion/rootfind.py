@@ -0,0 +1,119 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Root finding on functions of the julian day, used by the searches
+    of exact astronomical events (lunations, transits, ingresses).
+    The roots are first bracketed on a coarse grid, then refined.
+"""
+
+import numpy as np
+
+
+# Default precision of the refined roots: 1e-6 days, about 0.1 seconds.
+TOLERANCE = 1e-6
+
+
+def wrap180(deg):
+    """Reduces degrees (numbers or arrays) to -180, 180."""
+    return (deg + 180) % 360 - 180
+
+
+def bracket_crossings(values, max_jump=90.0):
+    """
+    Finds where a sampled angle difference goes from negative to
+    non negative or the other way, skipping the jumps from 180 to -180.
+    Returns the indexes i with the sign change between i and i + 1.
+    Args: sampled values in -180, 180, largest change of a real crossing.
+    """
+    values = np.asarray(values)
+    before, after = values[:-1], values[1:]
+    changed = (before < 0) != (after < 0)
+    continuous = np.abs(after - before) < max_jump
+    return np.nonzero(changed & continuous)[0]
+
+
+def refine_root(func, a, b, fa=None, fb=None, tol=TOLERANCE, max_iter=100):
+    """
+    Refines a root of func between a and b, where func changes sign.
+    func returns the value and its derivative (or None), when the
+    Newton step falls out of the bracket a bisection step is used.
+    Returns the julian day of the root.
+    Args: function, bracket start, bracket end, values at the ends
+    (calculated if missing), precision in days, most iterations.
+    """
+    if fa is None:
+        fa = func(a)[0]
+    if fb is None:
+        fb = func(b)[0]
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if (fa < 0) == (fb < 0):
+        raise ValueError("The function doesn't change sign in the bracket.")
+
+    x = a + (b - a) * fa / (fa - fb)
+    for _ in range(max_iter):
+        fx, dfx = func(x)
+        if fx == 0:
+            return x
+        if (fx < 0) == (fa < 0):
+            a, fa = x, fx
+        else:
+            b, fb = x, fx
+        if b - a < tol:
+            break
+
+        step = None
+        if dfx:
+            step = x - fx / dfx
+        if step is None or not a < step < b:
+            step = (a + b) / 2
+        if abs(step - x) < tol / 2:
+            return step
+        x = step
+
+    return (a + b) / 2
+
+
+def hermite_roots(y0, y1, d0, d1, tol=1e-12, iterations=30):
+    """
+    Finds the roots of the cubic Hermite curves through the samples,
+    for many brackets at once, with safeguarded Newton steps.
+    Every curve goes from y0 to y1 (with opposite signs) on the
+    interval 0, 1 with derivatives d0 and d1 (already multiplied by
+    the length of the interval).
+    Returns the positions of the roots in 0, 1.
+    Args: arrays of start values, end values, start derivatives,
+    end derivatives, precision in 0, 1, most iterations.
+    """
+    y0, y1, d0, d1 = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                           for a in (y0, y1, d0, d1)))
+    rising = y1 > y0
+    lo = np.zeros(y0.shape)
+    hi = np.ones(y0.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.clip(y0 / (y0 - y1), 0, 1)
+
+    for _ in range(iterations):
+        x2, x3 = x * x, x * x * x
+        value = ((2 * x3 - 3 * x2 + 1) * y0 + (x3 - 2 * x2 + x) * d0
+                 + (-2 * x3 + 3 * x2) * y1 + (x3 - x2) * d1)
+        slope = ((6 * x2 - 6 * x) * y0 + (3 * x2 - 4 * x + 1) * d0
+                 + (-6 * x2 + 6 * x) * y1 + (3 * x2 - 2 * x) * d1)
+
+        below = (value < 0) == rising
+        lo = np.where(below, x, lo)
+        hi = np.where(below, hi, x)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = x - value / slope
+        # a converged step can fall just out of the bracket (x is one
+        # of its ends), it is kept instead of bisecting again.
+        inside = ((step > lo) & (step < hi)) | (np.abs(step - x) <= tol)
+        new_x = np.where(value == 0, x, np.where(inside, step, (lo + hi) / 2))
+        if not np.any(np.abs(new_x - x) > tol):
+            return new_x
+        x = new_x
+
+    return x
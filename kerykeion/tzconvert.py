@@ -0,0 +1,155 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Local time to utc conversion with cached time zones.
+    The utc offsets of every zone are read once from pytz and kept
+    as sorted arrays, the conversions are binary searches on them.
+"""
+
+import datetime
+from functools import lru_cache
+import numpy as np
+import pytz
+
+
+# Status of every converted local time.
+OK, AMBIGUOUS, NON_EXISTENT = 0, 1, 2
+
+EPOCH = datetime.datetime(1970, 1, 1)
+# Julian day of EPOCH, used by the modules converting julian days
+# to datetimes.
+EPOCH_JD = 2440587.5
+
+
+def _seconds(naive):
+    """Internal function, seconds from EPOCH of a naive datetime."""
+    delta = naive - EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_str):
+    """Returns the pytz time zone, loading it only once."""
+    return pytz.timezone(tz_str)
+
+
+class ZoneTable():
+    """
+    Utc offsets of a time zone as sorted arrays.
+    Args: time zone string (Ex: "Europe/Rome").
+    """
+
+    def __init__(self, tz_str):
+        zone = get_zone(tz_str)
+        self.zone = zone
+
+        transitions = getattr(zone, "_utc_transition_times", None)
+        if transitions:
+            utc_starts = [_seconds(t) for t in transitions]
+            offsets = [int(info[0].total_seconds())
+                       for info in zone._transition_info]
+        else:
+            utc_starts = [_seconds(datetime.datetime.min)]
+            offset = zone.utcoffset(datetime.datetime(2000, 1, 1))
+            offsets = [int(offset.total_seconds())]
+
+        utc_starts = np.array(utc_starts, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        # the local time of every period goes from its start to its end.
+        self.local_starts = utc_starts + self.offsets
+        self.local_ends = np.append(utc_starts[1:] + self.offsets[:-1],
+                                    np.iinfo(np.int64).max)
+
+    def utc_seconds(self, local_seconds):
+        """
+        Converts local seconds from EPOCH to utc seconds.
+        Returns utc seconds and status arrays, the utc seconds of
+        ambiguous and non existent local times are not valid.
+        """
+        local_seconds = np.asarray(local_seconds, dtype=np.int64)
+
+        period = np.searchsorted(self.local_starts, local_seconds,
+                                 side="right") - 1
+        period = np.maximum(period, 0)
+        previous = np.maximum(period - 1, 0)
+
+        in_period = local_seconds < self.local_ends[period]
+        # after a backward change the previous period covers it too.
+        in_previous = ((period > 0) & (local_seconds < self.local_ends[previous])
+                       & (local_seconds >= self.local_starts[previous]))
+
+        status = np.full(local_seconds.shape, OK, dtype=np.int8)
+        status[in_period & in_previous] = AMBIGUOUS
+        status[~in_period & ~in_previous] = NON_EXISTENT
+
+        chosen = np.where(in_period, period, previous)
+        return local_seconds - self.offsets[chosen], status
+
+
+@lru_cache(maxsize=None)
+def get_table(tz_str):
+    """Returns the ZoneTable of a time zone, building it only once."""
+    return ZoneTable(tz_str)
+
+
+def local_to_utc(tz_str, naive):
+    """
+    Converts a naive local datetime to an aware utc datetime,
+    like pytz localize(naive, is_dst=None).
+    Raises pytz AmbiguousTimeError or NonExistentTimeError.
+    """
+    utc, status = get_table(tz_str).utc_seconds([_seconds(naive)])
+
+    if status[0] == AMBIGUOUS:
+        raise pytz.exceptions.AmbiguousTimeError(naive)
+    if status[0] == NON_EXISTENT:
+        raise pytz.exceptions.NonExistentTimeError(naive)
+
+    utc_naive = EPOCH + datetime.timedelta(seconds=int(utc[0]))
+    return pytz.utc.localize(utc_naive)
+
+
+def _julian_days(utc_seconds):
+    """
+    Internal function, julian days of utc seconds with the same
+    conversion as AstroData.get_jd(): the seconds are dropped.
+    """
+    days, seconds = np.divmod(utc_seconds, 86400)
+    hours = seconds // 3600 + (seconds % 3600 // 60) / 60
+    return (EPOCH_JD + days) + hours / 24
+
+
+def local_to_julian_days(tz_str, local_times):
+    """
+    Converts local times to julian days.
+    Returns julian days and status arrays: the julian day of
+    ambiguous and non existent local times is nan, their status
+    is AMBIGUOUS or NON_EXISTENT instead of OK.
+    Args: time zone string or a list with one for every local time,
+    naive datetimes or numpy datetime64 local times.
+    """
+    local_seconds = np.asarray(local_times, dtype="datetime64[s]").astype(
+        np.int64)
+
+    if isinstance(tz_str, str):
+        utc, status = get_table(tz_str).utc_seconds(local_seconds)
+    else:
+        tz_str = np.asarray(tz_str)
+        utc = np.empty(local_seconds.shape, dtype=np.int64)
+        status = np.empty(local_seconds.shape, dtype=np.int8)
+        for zone in np.unique(tz_str):
+            mask = tz_str == zone
+            utc[mask], status[mask] = get_table(zone).utc_seconds(
+                local_seconds[mask])
+
+    j_days = _julian_days(utc)
+    j_days[status != OK] = np.nan
+    return j_days, status
+
+
+if __name__ == "__main__":
+    # 2:30 doesn't exist in Rome on the last Sunday of March 2021.
+    print(local_to_utc("Europe/Rome", datetime.datetime(1990, 6, 15, 15, 15)))
+    print(local_to_julian_days("Europe/Rome", [
+        datetime.datetime(2021, 3, 28, 1, 30),
+        datetime.datetime(2021, 3, 28, 2, 30)]))
@@ -0,0 +1,274 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Offline time zones of latitude and longitude, from the polygons of a
+    time zone boundaries GeoJSON file (ex: combined.json or
+    combined-with-oceans.json of timezone-boundary-builder,
+    https://github.com/evansiroky/timezone-boundary-builder).
+
+    Spatial index:
+    the world is split in a grid of cells of cell_size degrees.
+    Every cell has the polygons with an edge crossing it and, when the
+    cell is all inside a polygon, the time zone of that polygon, so most
+    points are resolved without any geometry. The others are tested
+    against the polygons of their cell with a ray to the east, using only
+    the edges in the band of latitudes of their grid row.
+    Where polygons overlap, the point gets the zone of one of them.
+    Points outside every polygon (the seas, with the files without
+    oceans) get the nautical zone of their longitude, ex: "Etc/GMT-1".
+
+    TimezoneIndex.from_geojson() reads the GeoJSON (slow, the file is
+    big), save() and load() store the index as .npz to start quickly.
+"""
+
+import json
+import numpy as np
+
+
+def nautical_zone(lng):
+    """
+    Returns the nautical time zone of a longitude, 15 degrees wide
+    (ex: 20 -> "Etc/GMT-1", the sign of the Etc zones is inverted).
+    """
+    hours = int(round(lng / 15))
+    return "Etc/GMT" if hours == 0 else f"Etc/GMT{-hours:+d}"
+
+
+def _read_geojson(path):
+    """
+    Internal function, returns the time zone names, the time zone of
+    every polygon and the edges of the polygons (x1, y1, x2, y2)
+    with the polygon of every edge.
+    """
+    with open(path, encoding="utf-8") as file:
+        features = json.load(file)["features"]
+
+    tzids = sorted({f["properties"]["tzid"] for f in features})
+    tz_index = {tz: i for i, tz in enumerate(tzids)}
+    polygon_tz = []
+    edges = []
+    edge_polygon = []
+    for feature in features:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        else:
+            polygons = geometry["coordinates"]
+
+        for rings in polygons:
+            for ring in rings:
+                points = np.asarray(ring, dtype=np.float64)[:, :2]
+                # closed rings: the last point is the first one.
+                edges.append(np.hstack([points[:-1], points[1:]]))
+                edge_polygon.append(np.full(len(points) - 1, len(polygon_tz)))
+            polygon_tz.append(tz_index[feature["properties"]["tzid"]])
+
+    return (tzids, np.array(polygon_tz, dtype=np.int32), np.vstack(edges),
+            np.concatenate(edge_polygon).astype(np.int32))
+
+
+class TimezoneIndex():
+    """
+    Finds the time zone of latitudes and longitudes.
+    Ex:
+        index = TimezoneIndex.from_geojson("combined-with-oceans.json")
+        index.save("timezones.npz")
+        index = TimezoneIndex.load("timezones.npz")
+        index.timezone_at(41.9, 12.5)  # "Europe/Rome"
+    Args: time zone names, time zone of every polygon, edges of the
+    polygons as (x1, y1, x2, y2) rows, polygon of every edge,
+    size of the grid cells in degrees.
+    """
+
+    def __init__(self, tzids, polygon_tz, edges, edge_polygon, cell_size=1.0):
+        self.tzids = list(tzids)
+        self.polygon_tz = np.asarray(polygon_tz, dtype=np.int32)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.edge_polygon = np.asarray(edge_polygon, dtype=np.int32)
+        self.cell_size = float(cell_size)
+        self.rows = int(np.ceil(180 / self.cell_size))
+        self.columns = int(np.ceil(360 / self.cell_size))
+        self._build_bands()
+        self._build_cells()
+
+    @classmethod
+    def from_geojson(cls, path, cell_size=1.0):
+        """Builds the index of a time zone boundaries GeoJSON file."""
+        return cls(*_read_geojson(path), cell_size=cell_size)
+
+    @classmethod
+    def load(cls, path):
+        """Loads an index saved with save()."""
+        with np.load(path) as data:
+            return cls(data["tzids"].tolist(), data["polygon_tz"],
+                       data["edges"], data["edge_polygon"],
+                       float(data["cell_size"]))
+
+    def save(self, path):
+        """Saves the polygons of the index as .npz."""
+        np.savez(path, tzids=np.array(self.tzids), polygon_tz=self.polygon_tz,
+                 edges=self.edges, edge_polygon=self.edge_polygon,
+                 cell_size=self.cell_size)
+
+    def _row(self, lat):
+        """Internal function, grid rows of latitudes."""
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_size),
+                       0, self.rows - 1).astype(np.int64)
+
+    def _column(self, lng):
+        """Internal function, grid columns of longitudes."""
+        return np.clip(np.floor((np.asarray(lng) + 180) / self.cell_size),
+                       0, self.columns - 1).astype(np.int64)
+
+    def _build_bands(self):
+        """
+        Internal function, sorts the edges by polygon and grid row,
+        an edge crossing more rows is in every one of them.
+        """
+        edges = self.edges
+        low = self._row(np.minimum(edges[:, 1], edges[:, 3]))
+        high = self._row(np.maximum(edges[:, 1], edges[:, 3]))
+        counts = high - low + 1
+        index = np.repeat(np.arange(len(edges)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(low, counts) + np.arange(len(index)) - first
+
+        keys = self.edge_polygon[index].astype(np.int64) * self.rows + rows
+        order = np.argsort(keys, kind="stable")
+        self._band_keys = keys[order]
+        self._band_edges = edges[index[order]]
+
+    def _band(self, polygon, row):
+        """Internal function, edges of a polygon in a grid row."""
+        key = polygon * self.rows + row
+        start = np.searchsorted(self._band_keys, key, "left")
+        end = np.searchsorted(self._band_keys, key, "right")
+        return self._band_edges[start:end]
+
+    def _contains(self, polygon, row, lng, lat):
+        """
+        Internal function, True for the points inside a polygon
+        (even-odd rule, the holes are rings of the same polygon).
+        Args: polygon, grid row of the points, arrays of longitudes
+        and latitudes.
+        """
+        x1, y1, x2, y2 = self._band(polygon, row).T
+        inside = np.zeros(len(lng), dtype=bool)
+        # in blocks, so the points x edges arrays stay small.
+        step = max(1, 2 ** 20 // max(len(x1), 1))
+        for start in range(0, len(lng), step):
+            x = lng[start:start + step, None]
+            y = lat[start:start + step, None]
+            straddles = (y1 > y) != (y2 > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cross_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            crossings = np.count_nonzero(straddles & (x < cross_x), axis=1)
+            inside[start:start + step] = crossings % 2 == 1
+        return inside
+
+    def _build_cells(self):
+        """
+        Internal function, finds the polygons crossing every cell and
+        the cells all inside a polygon.
+        """
+        edges = self.edges
+        row_low = self._row(np.minimum(edges[:, 1], edges[:, 3]))
+        row_high = self._row(np.maximum(edges[:, 1], edges[:, 3]))
+        column_low = self._column(np.minimum(edges[:, 0], edges[:, 2]))
+        column_high = self._column(np.maximum(edges[:, 0], edges[:, 2]))
+
+        # every cell touched by the bounding box of an edge.
+        heights = row_high - row_low + 1
+        widths = column_high - column_low + 1
+        counts = heights * widths
+        index = np.repeat(np.arange(len(edges)), counts)
+        step = np.arange(len(index)) - np.repeat(np.cumsum(counts) - counts,
+                                                 counts)
+        rows = row_low[index] + step // widths[index]
+        columns = column_low[index] + step % widths[index]
+        pairs = np.unique(np.stack([rows * self.columns + columns,
+                                    self.edge_polygon[index]], axis=1), axis=0)
+        self._cell_offsets = np.searchsorted(
+            pairs[:, 0], np.arange(self.rows * self.columns + 1))
+        self._cell_polygons = pairs[:, 1]
+
+        # the cells in the bounding box of a polygon, not crossed by it,
+        # are all inside or all outside: the center tells which.
+        self._cell_zone = np.full(self.rows * self.columns, -1, dtype=np.int32)
+        crossed = set(map(tuple, pairs.tolist()))
+        polygons = len(self.polygon_tz)
+        boxes = np.zeros((4, polygons), dtype=np.int64)
+        boxes[:2] = np.iinfo(np.int64).max
+        np.minimum.at(boxes[0], self.edge_polygon, row_low)
+        np.minimum.at(boxes[1], self.edge_polygon, column_low)
+        np.maximum.at(boxes[2], self.edge_polygon, row_high)
+        np.maximum.at(boxes[3], self.edge_polygon, column_high)
+        for polygon, (first_row, first_column, last_row, last_column) in \
+                enumerate(boxes.T.tolist()):
+            for row in range(first_row, last_row + 1):
+                cells = row * self.columns + np.arange(first_column,
+                                                       last_column + 1)
+                cells = np.array([c for c in cells.tolist()
+                                  if (c, polygon) not in crossed], dtype=np.int64)
+                if not len(cells):
+                    continue
+                lng = (cells % self.columns + 0.5) * self.cell_size - 180
+                lat = np.full(len(cells), (row + 0.5) * self.cell_size - 90)
+                inside = self._contains(polygon, row, lng, lat)
+                self._cell_zone[cells[inside]] = self.polygon_tz[polygon]
+
+    def timezone_at(self, lat, lng):
+        """
+        Returns the time zone name of a point.
+        Args: latitude, longitude.
+        """
+        return self.timezones([lat], [lng])[0]
+
+    def timezones(self, lats, lngs):
+        """
+        Returns the time zone names of many points, in a list.
+        Args: sequences (or arrays) of latitudes and longitudes.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        rows = self._row(lats)
+        cells = rows * self.columns + self._column(lngs)
+        zones = np.full(len(lats), -1, dtype=np.int32)
+
+        # the points in crossed cells, grouped by cell.
+        order = np.argsort(cells, kind="stable")
+        bounds = np.flatnonzero(np.diff(cells[order])) + 1
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            cell = cells[group[0]]
+            start, end = self._cell_offsets[cell:cell + 2]
+            for polygon in self._cell_polygons[start:end]:
+                left = group[zones[group] < 0]
+                if not len(left):
+                    break
+                inside = self._contains(polygon, rows[group[0]], lngs[left],
+                                        lats[left])
+                zones[left[inside]] = self.polygon_tz[polygon]
+
+        left = zones < 0
+        zones[left] = self._cell_zone[cells[left]]
+        return [self.tzids[zone] if zone >= 0 else nautical_zone(lng)
+                for zone, lng in zip(zones.tolist(), lngs.tolist())]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # python -m kerykeion.tzindex combined.json timezones.npz
+    index = TimezoneIndex.from_geojson(sys.argv[1])
+    index.save(sys.argv[2])
+    index = TimezoneIndex.load(sys.argv[2])
+    print(index.timezone_at(41.9, 12.5), index.timezone_at(33.749, -84.38))
+
+    lats = np.random.uniform(-90, 90, 100000)
+    lngs = np.random.uniform(-180, 180, 100000)
+    start = time.perf_counter()
+    index.timezones(lats, lngs)
+    print(f"{time.perf_counter() - start:.2f} s for 100000 points")
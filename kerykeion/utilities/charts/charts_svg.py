@@ -92,8 +92,8 @@ class MakeSvgInstance:
 
         self.points_retrograde = []
 
-        for planet in self.user.planets_list:
-            self.points_retrograde.append(planet["retrograde"])
+        for state in self.user.planets_state:
+            self.points_retrograde.append(state.lon_speed < 0)
         
         self.points_retrograde = self.points_retrograde + [False,
          False, False, False]
@@ -149,8 +149,8 @@ class MakeSvgInstance:
 
             self.t_points_retrograde = []
 
-            for planet in self.t_user.planets_list:
-                self.t_points_retrograde.append(planet["retrograde"])
+            for state in self.t_user.planets_state:
+                self.t_points_retrograde.append(state.lon_speed < 0)
             
             self.t_points_retrograde = self.t_points_retrograde + [False,
             False, False, False]
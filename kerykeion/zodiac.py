@@ -0,0 +1,61 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+
+    Shared, immutable table of the zodiac signs and the functions
+    that split longitudes in sign and position in the sign.
+"""
+
+from collections import namedtuple
+import numpy as np
+
+
+ELEMENTS = ("Fire", "Earth", "Air", "Water")
+QUALITIES = ("Cardinal", "Fixed", "Mutable")
+
+Sign = namedtuple("Sign", ["sign", "sign_num", "element", "quality",
+                           "emoji"])
+
+# The element of a sign is sign_num % 4, the quality is sign_num % 3.
+ZODIAC = tuple(
+    Sign(sign, num, ELEMENTS[num % 4], QUALITIES[num % 3], emoji)
+    for num, (sign, emoji) in enumerate([
+        ("Ari", "♈️"), ("Tau", "♉️"), ("Gem", "♊️"), ("Can", "♋️"),
+        ("Leo", "♌️"), ("Vir", "♍️"), ("Lib", "♎️"), ("Sco", "♏️"),
+        ("Sag", "♐️"), ("Cap", "♑️"), ("Aqu", "♒️"), ("Pis", "♓️")
+    ])
+)
+
+SIGNS = tuple(z.sign for z in ZODIAC)
+EMOJIS = tuple(z.emoji for z in ZODIAC)
+
+
+def decompose(degs):
+    """
+    Splits longitudes in 360° in sign number, position in the sign,
+    element code (index of ELEMENTS) and quality code (index of QUALITIES).
+    Returns four arrays shaped like degs.
+    """
+    degs = np.asarray(degs, dtype=np.float64)
+    sign_num = (degs // 30).astype(np.int64) % 12
+    pos = degs - sign_num * 30
+    sign_num = sign_num.astype(np.int8)
+    return sign_num, pos, sign_num % 4, sign_num % 3
+
+
+def point_dict(degree, number_name, label):
+    """
+    Creates the dictionary of a point (planet or house) in 360°,
+    like Calculator.pos_calc().
+    Args: degree, name, key for the name.
+    """
+    if not degree < 360:
+        return {label: "pos_calc error", "sign": "pos_calc error",
+                "pos": "pos_calc error"}
+
+    sign_num = max(int(degree // 30), 0)
+    sign = ZODIAC[sign_num]
+
+    return {label: number_name, "quality": sign.quality, "element":
+            sign.element, "sign": sign.sign, "sign_num": sign_num,
+            "pos": degree - sign_num * 30, "abs_pos": degree,
+            "emoji": sign.emoji}
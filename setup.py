@@ -2,14 +2,20 @@
     This is part of Kerykeion (C) 2020 Giacomo Battaglia
 """
 
+import re
 import setuptools
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+# the version is kept only in kerykeion/__init__.py, read without
+# importing the package (its dependencies aren't installed yet).
+with open("kerykeion/__init__.py", "r") as fh:
+    version = re.search(r'^__version__ = "([^"]+)"', fh.read(), re.M).group(1)
+
 setuptools.setup(
     name="kerykeion",
-    version="1.3.0",
+    version=version,
     author="Giacomo Battaglia",
     author_email="battaglia.giacomo@yahoo.it",
     description="An astrology library.",
@@ -24,5 +30,5 @@ setuptools.setup(
     ],
     include_package_data=True,
     python_requires='>=3.6',
-    install_requires = ['pyswisseph', 'pytz', 'jsonpickle'],
+    install_requires = ['pyswisseph', 'pytz', 'jsonpickle', 'numpy'],
 )
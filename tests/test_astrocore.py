@@ -0,0 +1,74 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import json
+import pytest
+from kerykeion.astrocore import CalculatorCitySearch, CalculatorPosition
+from kerykeion.context import make_context
+
+
+def jack(**options):
+    user = CalculatorPosition("Jack", 1990, 6, 15, 15, 15, 12.5, 41.9,
+                              "Europe/Rome")
+    for name, value in options.items():
+        setattr(user, name, value)
+    user.get_all()
+    return user
+
+
+def test_options_changed_after_get_all():
+    user = jack()
+    user.zodiactype = "sidereal"
+    expected = jack(zodiactype="sidereal")
+    assert user.sun == expected.sun
+    assert user.planets_list == expected.planets_list
+    assert user.lunar_phase == expected.lunar_phase
+
+    user.houses_system = "K"
+    expected = jack(zodiactype="sidereal", houses_system="K")
+    assert user.house_list == expected.house_list
+    assert user.planets_houses == expected.planets_houses
+
+
+def test_context_changed_after_get_all():
+    user = jack()
+    context = make_context("sidereal", "LAHIRI", "R")
+    user.context = context
+    expected = jack(context=context)
+    assert user.planets_list == expected.planets_list
+    assert user.house_list == expected.house_list
+
+
+def test_wrong_options_rejected():
+    user = jack()
+    for name, value in (("houses_system", "G"), ("zodiactype", "tropical")):
+        with pytest.raises(ValueError):
+            setattr(user, name, value)
+    assert (user.zodiactype, user.houses_system) == ("Tropic", "P")
+
+
+def test_geocoded_once():
+    calls = []
+
+    def geocoder(name, country):
+        calls.append(name)
+        return [{"lat": "41.9", "lng": "12.5", "timezonestr": "Europe/Rome"}]
+
+    user = CalculatorCitySearch("Jack", 1990, 6, 15, 15, 15, "Roma", "IT",
+                                geocoder=geocoder)
+    str(user)
+    user.get_all()
+    assert calls == ["Roma"]
+    assert user.sun == jack().sun
+
+
+def test_json_without_internal_attributes():
+    user = jack()
+    data = json.loads(user.json_dump(dump=False))
+    for name in ("planets_state", "planets_retrograde", "houses_system_used",
+                 "tz_resolver", "json_dir", "json_path"):
+        assert name not in data
+    assert data["sun"] == user.sun
+    # the chart itself keeps them.
+    assert user.planets_state and user.houses_system_used == "P"
@@ -0,0 +1,43 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import numpy as np
+from kerykeion.astrocore import CalculatorPosition, time_stage
+from kerykeion.batch import BatchCalculator
+from kerykeion.context import make_context
+
+
+def kanye(context=None):
+    user = CalculatorPosition("Kanye", 1977, 6, 8, 8, 45, -84.38, 33.749,
+                              "America/New_York")
+    if context is not None:
+        user.context = context
+    user.get_all()
+    return user
+
+
+def test_same_as_calculator():
+    for context in (make_context(), make_context("sidereal", "LAHIRI")):
+        user = kanye(context)
+        batch = BatchCalculator([user.j_day, user.j_day + 1, user.j_day],
+                                33.749, -84.38, context)
+        batch.get_all()
+        for row in (0, 2):
+            assert batch.planets_state[row].tolist() == \
+                [list(state) for state in user.planets_state]
+            assert batch.houses_degree_ut[row].tolist() == \
+                list(user.houses_degree_ut)
+            assert batch.planets_houses[row].tolist() == user.planets_houses
+        assert not np.array_equal(batch.planets_degs[0],
+                                  batch.planets_degs[1])
+
+
+def test_time_stage_cache_untouched():
+    time_stage.cache_clear()
+    days = np.linspace(2451545, 2451545 + 100, 500)
+    batch = BatchCalculator(np.concatenate([days, days]))
+    batch.planets()
+    assert time_stage.cache_info().currsize == 0
+    assert batch.planets_degs.shape == (1000, 12)
+    assert np.array_equal(batch.planets_degs[:500], batch.planets_degs[500:])
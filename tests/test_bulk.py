@@ -0,0 +1,48 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import random
+from kerykeion.astrocore import CalculatorPosition
+from kerykeion.bulk import compute_charts, iter_charts
+
+
+def records(n, seed=5):
+    rng = random.Random(seed)
+    result = []
+    for index in range(n):
+        record = (f"Test {index}", rng.randrange(1900, 2030),
+                  rng.randrange(1, 13), rng.randrange(1, 29),
+                  rng.randrange(24), rng.randrange(60),
+                  rng.uniform(-180, 180), rng.uniform(-60, 60),
+                  rng.choice(["Europe/Rome", "America/New_York", "UTC"]))
+        if index % 7 == 3:
+            record = record[:8] + ("Nowhere/Nothing",)
+        result.append(record)
+    return result
+
+
+def test_results_in_input_order_with_errors():
+    data = records(60)
+    results = compute_charts(data, workers=2, chunksize=4)
+    assert [r.index for r in results] == list(range(len(data)))
+
+    for record, result in zip(data, results):
+        if record[8] == "Nowhere/Nothing":
+            assert result.chart is None and "Nowhere/Nothing" in result.error
+            continue
+        assert result.error is None
+        user = CalculatorPosition(*record)
+        user.get_all()
+        assert result.chart.name == record[0]
+        assert result.chart.sun["abs_pos"] == user.sun["abs_pos"]
+
+
+def test_single_process_same_results():
+    data = records(20, seed=9)
+    pooled = compute_charts(data, workers=2, chunksize=3)
+    local = list(iter_charts(data, workers=1, chunksize=3))
+    assert [(r.index, r.error) for r in pooled] == \
+        [(r.index, r.error) for r in local]
+    assert [r.chart and r.chart.sun["abs_pos"] for r in pooled] == \
+        [r.chart and r.chart.sun["abs_pos"] for r in local]
@@ -0,0 +1,48 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import numpy as np
+import pytest
+from kerykeion.astrocore import get_iflag
+from kerykeion.chebyshev import (ERROR_MARGIN, TOLERANCE, ChebyshevEphemeris,
+                                 _longitudes, build_table)
+
+
+@pytest.fixture(scope="module")
+def ephemeris(tmp_path_factory):
+    path = tmp_path_factory.mktemp("chebyshev") / "tables.bin"
+    build_table(str(path), 2000, 2004)
+    return ChebyshevEphemeris(str(path))
+
+
+def test_check_within_error_bounds(ephemeris):
+    days = np.random.default_rng(7).uniform(ephemeris.start, ephemeris.end,
+                                            5000)
+    for body in ephemeris.tables:
+        lon_err, speed_err = ephemeris.check(body, days)
+        lon_bound, speed_bound = ephemeris.error_bounds[body]
+        assert lon_err <= lon_bound <= TOLERANCE * ERROR_MARGIN, body
+        assert speed_err <= speed_bound, body
+
+
+def test_marked_segments_use_swisseph(ephemeris):
+    # the outer planets have conjunctions with the Sun in every year.
+    boundaries, _, flags = ephemeris.tables[8]
+    assert flags.any()
+    rows = np.nonzero(flags)[0]
+    days = (boundaries[rows] + boundaries[rows + 1]) / 2
+    lon, speed = ephemeris.positions(8, days)
+    expected = _longitudes(8, days, get_iflag("Tropic"))
+    assert np.array_equal(lon, expected[0])
+    assert np.array_equal(speed, expected[1])
+
+
+def test_positions_shape_and_range(ephemeris):
+    days = np.linspace(ephemeris.start, ephemeris.end, 12).reshape(3, 4)
+    lon, speed = ephemeris.positions(0, days)
+    assert lon.shape == speed.shape == (3, 4)
+    assert np.all((lon >= 0) & (lon < 360))
+
+    with pytest.raises(ValueError):
+        ephemeris.positions(0, [ephemeris.end + 1])
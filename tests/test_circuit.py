@@ -0,0 +1,111 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import time
+from kerykeion.circuit import OPEN, CircuitBreaker, ResilientGeocoder
+
+
+RESULT = [{"name": "Roma", "timezonestr": "Europe/Rome"}]
+OFFLINE = [{"name": "Roma", "timezonestr": "UTC"}]
+
+
+def offline_search(name, country=""):
+    return OFFLINE
+
+
+def failing_search(name, country=""):
+    raise ConnectionError("service unavailable")
+
+
+def test_fast_success_with_hedging():
+    # the answer comes before hedge_after: no second request.
+    geocoder = ResilientGeocoder(lambda name, country: RESULT, offline_search,
+                                 timeout=1, hedge_after=0.2)
+    assert geocoder.search("Roma") is RESULT
+    stats = geocoder.stats()
+    assert stats["failures"] == 0 and stats["fallbacks"] == 0
+    assert stats["hedged"] == 0
+    geocoder.close()
+
+
+def test_slow_call_is_hedged():
+    calls = []
+
+    def search(name, country=""):
+        calls.append(name)
+        if len(calls) == 1:
+            time.sleep(0.5)
+        return RESULT
+
+    geocoder = ResilientGeocoder(search, offline_search, timeout=1,
+                                 hedge_after=0.05)
+    assert geocoder.search("Roma") is RESULT
+    assert geocoder.stats()["hedged"] == 1
+    assert geocoder.stats()["hedge_wins"] == 1
+    geocoder.close()
+
+
+def test_fallback_on_failure_and_timeout():
+    geocoder = ResilientGeocoder(failing_search, offline_search, timeout=1)
+    assert geocoder.search("Roma") is OFFLINE
+
+    geocoder = ResilientGeocoder(lambda name, country: time.sleep(0.5),
+                                 offline_search, timeout=0.05)
+    assert geocoder.search("Roma") is OFFLINE
+    assert geocoder.stats()["failures"] == 1
+    geocoder.close()
+
+
+def test_open_circuit_uses_fallback():
+    breaker = CircuitBreaker(min_calls=2, reset_timeout=60)
+    geocoder = ResilientGeocoder(failing_search, offline_search, breaker,
+                                 timeout=1)
+    for _ in range(3):
+        assert geocoder.search("Roma") is OFFLINE
+    stats = geocoder.stats()
+    assert stats["state"] == OPEN
+    assert stats["calls"] == 2 and stats["rejected"] == 1
+    geocoder.close()
+
+
+def test_half_open_success_closes():
+    now = [0.0]
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=10,
+                             clock=lambda: now[0])
+    breaker.record(False)
+    assert not breaker.allow()
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+
+
+def test_late_results_ignored_after_opening():
+    now = [0.0]
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=10,
+                             clock=lambda: now[0])
+    now[0] = 1
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.opened == 1
+
+    # a call allowed before the opening, answering 3 seconds later.
+    now[0] = 3
+    breaker.record(False, 2.5)
+    assert breaker.opened == 1
+    now[0] = 11.5
+    assert breaker.allow()
+
+
+def test_counters_from_many_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    breaker = CircuitBreaker(min_calls=10 ** 6)
+    geocoder = ResilientGeocoder(failing_search, offline_search, breaker,
+                                 timeout=1, workers=16)
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda _: geocoder.search("Roma"), range(2000)))
+    stats = geocoder.stats()
+    assert stats["calls"] == stats["failures"] == stats["fallbacks"] == 2000
+    geocoder.close()
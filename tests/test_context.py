@@ -0,0 +1,62 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from kerykeion.astrocore import CalculatorPosition, time_stage
+from kerykeion.context import make_context, swe_calc
+
+
+CONTEXTS = [make_context(), make_context("sidereal"),
+            make_context("sidereal", "LAHIRI"),
+            make_context("sidereal", "RAMAN")]
+
+
+@pytest.fixture
+def jobs():
+    rng = random.Random(17)
+    return [(rng.uniform(2415020, 2488070), rng.randrange(10),
+             rng.choice(CONTEXTS)) for _ in range(20000)]
+
+
+@pytest.fixture
+def fast_switches():
+    # switch threads as often as possible, to make the races likely.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def chart(job):
+    j_day, _, context = job
+    user = CalculatorPosition("Test", 2000, 1, 1, 0, 0, 12.5, 41.9, "UTC")
+    user.j_day = j_day
+    user.context = context
+    user.get_all()
+    return user.planets_degs
+
+
+def test_swe_calc_threads(jobs, fast_switches):
+    expected = [swe_calc(*job) for job in jobs]
+    with ThreadPoolExecutor(8) as pool:
+        found = list(pool.map(lambda job: swe_calc(*job), jobs))
+    assert sum(f != e for f, e in zip(found, expected)) == 0
+
+
+def test_charts_threads(jobs, fast_switches):
+    jobs = jobs[:2000]
+    time_stage.cache_clear()
+    with ThreadPoolExecutor(8) as pool:
+        charts = list(pool.map(chart, jobs))
+    time_stage.cache_clear()
+    assert sum(c != chart(job) for c, job in zip(charts, jobs)) == 0
+
+
+def test_contexts_differ():
+    tropic, fagan, lahiri, _ = CONTEXTS
+    sun = [swe_calc(2451544.5, 0, c)[0] for c in (tropic, fagan, lahiri)]
+    assert len(set(sun)) == 3
@@ -0,0 +1,70 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import math
+import random
+import numpy as np
+import pytest
+import swisseph as swe
+from kerykeion.houses import (assign_houses, calc_houses, house_index,
+                              houses_grid)
+
+
+def point_between(p1, p2, p3):
+    """The test of the house of a point before the binary search."""
+    p1_p2 = math.fmod(p2 - p1 + 360, 360)
+    p1_p3 = math.fmod(p3 - p1 + 360, 360)
+    return (p1_p2 <= 180) != (p1_p3 > p1_p2)
+
+
+def linear_house(cusps, deg):
+    """The first house (1 to 12) of the point, checked in order."""
+    for house in range(12):
+        if point_between(cusps[house], cusps[(house + 1) % 12], deg):
+            return house + 1
+    return None
+
+
+def random_charts(n, rng):
+    charts = []
+    for _ in range(n):
+        j_day = rng.uniform(2415020, 2488070)
+        lat, lon = rng.uniform(-60, 60), rng.uniform(-180, 180)
+        hsys = rng.choice("PKORCEWBMTX")
+        charts.append(calc_houses(j_day, lat, lon, hsys)[0])
+    return charts
+
+
+def test_house_index_same_as_linear_search():
+    rng = random.Random(11)
+    for cusps in random_charts(300, rng):
+        # random points and the cusps themselves.
+        points = [rng.uniform(0, 360) for _ in range(40)] + list(cusps)
+        for deg in points:
+            assert house_index(cusps, deg) == linear_house(cusps, deg)
+
+
+def test_assign_houses_same_as_house_index():
+    rng = random.Random(12)
+    cusps = np.array(random_charts(200, rng))
+    degs = np.array([[rng.uniform(0, 360) for _ in range(12)]
+                     for _ in range(len(cusps))])
+    degs[:, 0] = cusps[:, 3]
+    houses = assign_houses(cusps, degs)
+    assert houses.shape == degs.shape
+    for chart, points, found in zip(cusps, degs, houses):
+        assert found.tolist() == [house_index(chart, d) for d in points]
+
+
+def test_polar_fallback():
+    j_day = swe.julday(2020, 6, 21, 12.0)
+    _, _, system = calc_houses(j_day, 80, 10, "P")
+    assert system == "O"
+    with pytest.raises(swe.Error):
+        calc_houses(j_day, 80, 10, "P", fallback=None)
+
+    cusps, angles, used_fallback = houses_grid(
+        j_day, np.array([[0.0], [80.0]]), np.array([[0.0, 90.0]]))
+    assert cusps.shape == (2, 2, 12) and angles.shape == (2, 2, 4)
+    assert used_fallback.tolist() == [[False, False], [True, True]]
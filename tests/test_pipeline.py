@@ -0,0 +1,44 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import json
+from kerykeion.pipeline import run_pipeline
+
+
+HEADER = "name,year,month,day,hours,minuts,lon,lat,tz_str\n"
+ROWS = [
+    "Jack,1990,6,15,15,15,12.5,41.9,Europe/Rome\n",
+    "Wrong,1990,6,15,15,15,12.5,41.9,Nowhere/Nothing\n",
+    "Kanye,1977,6,8,8,45,-84.38,33.749,America/New_York\n",
+]
+
+
+def test_csv_to_jsonl_in_order(tmp_path):
+    source = tmp_path / "births.csv"
+    target = tmp_path / "charts.jsonl"
+    source.write_text(HEADER + "".join(ROWS * 10), encoding="utf-8")
+
+    written, failed = run_pipeline(str(source), str(target), workers=2,
+                                   chunksize=3, max_pending=2)
+    assert (written, failed) == (20, 10)
+
+    lines = [json.loads(line) for line in
+             target.read_text(encoding="utf-8").splitlines()]
+    assert [line["index"] for line in lines] == list(range(30))
+    for line in lines:
+        if line["index"] % 3 == 1:
+            assert line["chart"] is None and "Nowhere/Nothing" in line["error"]
+        else:
+            assert line["error"] is None and line["chart"] is not None
+
+
+def test_jsonl_input(tmp_path):
+    source = tmp_path / "births.jsonl"
+    target = tmp_path / "charts.jsonl"
+    record = {"name": "Jack", "year": 1990, "month": 6, "day": 15,
+              "hours": 15, "minuts": 15, "lon": 12.5, "lat": 41.9,
+              "tz_str": "Europe/Rome"}
+    source.write_text("\n".join(json.dumps(record) for _ in range(5)) + "\n",
+                      encoding="utf-8")
+    assert run_pipeline(str(source), str(target), workers=1) == (5, 0)
@@ -0,0 +1,43 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import datetime
+import pytest
+from kerykeion.astrocore import CalculatorPosition
+from kerykeion.transits import find_transit_events, transit_hits
+
+
+@pytest.fixture(scope="module")
+def kanye():
+    natal = CalculatorPosition("Kanye", 1977, 6, 8, 8, 45, -84.38, 33.749,
+                               "America/New_York")
+    natal.get_all()
+    return natal
+
+
+def compare(natal, start, end, bodies):
+    fast = find_transit_events(natal, start, end, bodies=bodies)
+    precise = find_transit_events(natal, start, end, bodies=bodies,
+                                  precise=True)
+    assert [e[2:] for e in fast] == [e[2:] for e in precise]
+    return max(abs(f.j_day - p.j_day) * 86400 for f, p in zip(fast, precise))
+
+
+def test_fast_within_a_second_of_precise(kanye):
+    start, end = datetime.datetime(2021, 1, 1), datetime.datetime(2023, 1, 1)
+    assert compare(kanye, start, end, [0, 2, 3, 4, 5, 6, 7, 8, 9]) < 1
+    assert compare(kanye, start, datetime.datetime(2021, 3, 1), [1]) < 1
+
+
+def test_hits_in_order(kanye):
+    events = find_transit_events(kanye, datetime.datetime(2021, 1, 1),
+                                 datetime.datetime(2022, 1, 1), bodies=[5, 6])
+    assert [e.j_day for e in events] == sorted(e.j_day for e in events)
+
+    hits = transit_hits(events)
+    assert len(hits) > 10
+    for hit in hits:
+        times = [e.j_day for e in (hit.enter,) + hit.exact + (hit.leave,) if e]
+        assert times == sorted(times)
+        assert len(hit.exact) <= 3
@@ -0,0 +1,76 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import datetime
+import random
+import numpy as np
+import pytest
+import pytz
+from kerykeion.astrocore import julian_day
+from kerykeion.tzconvert import (AMBIGUOUS, NON_EXISTENT, OK, get_zone,
+                                 local_to_julian_days, local_to_utc)
+
+
+ZONES = ["Europe/Rome", "America/New_York", "Australia/Lord_Howe",
+         "Asia/Kolkata", "America/Sao_Paulo", "Europe/London",
+         "Pacific/Apia", "UTC"]
+
+
+def near_transitions(zone, n, rng):
+    """Random local times within 3 hours of the utc offset changes."""
+    tz = get_zone(zone)
+    transitions = getattr(tz, "_utc_transition_times", None)
+    if not transitions:
+        return [datetime.datetime(rng.randint(1850, 2100), rng.randint(1, 12),
+                                  rng.randint(1, 28), rng.randint(0, 23),
+                                  rng.randint(0, 59)) for _ in range(n)]
+
+    times = []
+    for _ in range(n):
+        index = rng.randrange(1, len(transitions))
+        offset = tz._transition_info[index][0]
+        local = transitions[index] + offset
+        times.append(local + datetime.timedelta(minutes=rng.randint(-180, 180)))
+    return times
+
+
+def pytz_utc(zone, naive):
+    """The utc time of pytz, or the class of its error."""
+    try:
+        return get_zone(zone).localize(naive, is_dst=None).astimezone(pytz.utc)
+    except (pytz.exceptions.AmbiguousTimeError,
+            pytz.exceptions.NonExistentTimeError) as error:
+        return type(error)
+
+
+@pytest.mark.parametrize("zone", ZONES)
+def test_same_as_pytz_near_transitions(zone):
+    rng = random.Random(zone)
+    times = near_transitions(zone, 2000, rng)
+    j_days, status = local_to_julian_days(zone, times)
+
+    for naive, j_day, state in zip(times, j_days, status):
+        expected = pytz_utc(zone, naive)
+        if expected is pytz.exceptions.AmbiguousTimeError:
+            assert state == AMBIGUOUS
+            with pytest.raises(expected):
+                local_to_utc(zone, naive)
+        elif expected is pytz.exceptions.NonExistentTimeError:
+            assert state == NON_EXISTENT
+            with pytest.raises(expected):
+                local_to_utc(zone, naive)
+        else:
+            assert state == OK
+            assert local_to_utc(zone, naive) == expected
+            assert j_day == julian_day(expected)
+
+
+def test_zones_per_time():
+    times = [datetime.datetime(2021, 3, 28, 2, 30)] * 2 + \
+        [datetime.datetime(2021, 11, 7, 1, 30)] * 2
+    zones = ["Europe/Rome", "America/New_York"] * 2
+    j_days, status = local_to_julian_days(zones, times)
+    assert status.tolist() == [NON_EXISTENT, OK, OK, AMBIGUOUS]
+    assert np.isnan(j_days[[0, 3]]).all()
+    assert j_days[1] == julian_day(pytz_utc("America/New_York", times[1]))
@@ -0,0 +1,98 @@
+"""
+    This is part of Kerykeion (C) 2020 Giacomo Battaglia
+"""
+
+import random
+import numpy as np
+from kerykeion.zodiac import ELEMENTS, QUALITIES, decompose, point_dict
+
+
+def old_pos_calc(degree, number_name, label):
+    """The if-chain point_dict() replaced."""
+    if degree < 30:
+        hou_dic = {label: number_name, "quality": "Cardinal", "element":
+                   "Fire", "sign": "Ari", "sign_num": 0, "pos": degree, "abs_pos": degree,
+                   "emoji": "♈️"}
+    elif degree < 60:
+        result = degree - 30
+        hou_dic = {label: number_name, "quality": "Fixed", "element":
+                   "Earth", "sign": "Tau", "sign_num": 1, "pos": result, "abs_pos": degree,
+                   "emoji": "♉️"}
+    elif degree < 90:
+        result = degree - 60
+        hou_dic = {label: number_name, "quality": "Mutable", "element":
+                   "Air", "sign": "Gem", "sign_num": 2, "pos": result, "abs_pos": degree,
+                   "emoji": "♊️"}
+    elif degree < 120:
+        result = degree - 90
+        hou_dic = {label: number_name, "quality": "Cardinal", "element":
+                   "Water", "sign": "Can", "sign_num": 3, "pos": result, "abs_pos": degree,
+                   "emoji": "♋️"}
+    elif degree < 150:
+        result = degree - 120
+        hou_dic = {label: number_name, "quality": "Fixed", "element":
+                   "Fire", "sign": "Leo", "sign_num": 4, "pos": result, "abs_pos": degree,
+                   "emoji": "♌️"}
+    elif degree < 180:
+        result = degree - 150
+        hou_dic = {label: number_name, "quality": "Mutable", "element":
+                   "Earth", "sign": "Vir", "sign_num": 5, "pos": result, "abs_pos": degree,
+                   "emoji": "♍️"}
+    elif degree < 210:
+        result = degree - 180
+        hou_dic = {label: number_name, "quality": "Cardinal", "element":
+                   "Air", "sign": "Lib", "sign_num": 6, "pos": result, "abs_pos": degree,
+                   "emoji": "♎️"}
+    elif degree < 240:
+        result = degree - 210
+        hou_dic = {label: number_name, "quality": "Fixed", "element":
+                   "Water", "sign": "Sco", "sign_num": 7, "pos": result, "abs_pos": degree,
+                   "emoji": "♏️"}
+    elif degree < 270:
+        result = degree - 240
+        hou_dic = {label: number_name, "quality": "Mutable", "element":
+                   "Fire", "sign": "Sag", "sign_num": 8, "pos": result, "abs_pos": degree,
+                   "emoji": "♐️"}
+    elif degree < 300:
+        result = degree - 270
+        hou_dic = {label: number_name, "quality": "Cardinal", "element":
+                   "Earth", "sign": "Cap", "sign_num": 9, "pos": result, "abs_pos": degree,
+                   "emoji": "♑️"}
+    elif degree < 330:
+        result = degree - 300
+        hou_dic = {label: number_name, "quality": "Fixed", "element":
+                   "Air", "sign": "Aqu", "sign_num": 10, "pos": result, "abs_pos": degree,
+                   "emoji": "♒️"}
+    elif degree < 360:
+        result = degree - 330
+        hou_dic = {label: number_name, "quality": "Mutable", "element":
+                   "Water", "sign": "Pis", "sign_num": 11, "pos": result, "abs_pos": degree,
+                   "emoji": "♓️"}
+    else:
+        hou_dic = {label: "pos_calc error", "sign": "pos_calc error",
+                   "pos": "pos_calc error"}
+
+    return hou_dic
+
+
+def test_point_dict_same_as_if_chain():
+    rng = random.Random(12)
+    degrees = [rng.uniform(0, 360) for _ in range(5000)]
+    # the sign boundaries, just under them and the error values.
+    degrees += [30.0 * n for n in range(12)]
+    degrees += [np.nextafter(30.0 * n, 0) for n in range(1, 13)]
+    degrees += [-5.0, 360.0, 400.0, float("nan")]
+    for degree in degrees:
+        assert point_dict(degree, "Sun", "name") == \
+            old_pos_calc(degree, "Sun", "name"), degree
+
+
+def test_decompose_same_as_point_dict():
+    degs = np.random.default_rng(3).uniform(0, 360, (50, 12))
+    sign_num, pos, element, quality = decompose(degs)
+    for index in np.ndindex(degs.shape):
+        point = point_dict(float(degs[index]), "Sun", "name")
+        assert sign_num[index] == point["sign_num"]
+        assert pos[index] == point["pos"]
+        assert ELEMENTS[element[index]] == point["element"]
+        assert QUALITIES[quality[index]] == point["quality"]